@@ -0,0 +1,181 @@
+"""
+Reproducible benchmark of the GA: solves the bundled puzzles with every combination of selection, crossover and
+mutation, with fixed seeds, and writes the results to a JSON file, so that the results of two commits can be compared.
+Each puzzle is also solved with the exact solver, as a ground truth and a speed baseline.
+
+    python benchmark.py --output results.json
+    python benchmark.py --compare base.json results.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+import puzzles
+from charles.charles_file import Original, Population
+from charles.selection import fps, tournament, ranking
+from charles.crossover import cycle_co, pmx_co
+from charles.mutation import swap_mutation, inversion_mutation
+from charles.exact import solve_exact
+
+PUZZLES = ["easy", "medium", "hard", "very_hard"]
+# The bigger puzzles are not benchmarked by default, but they can be chosen with --puzzles
+BIG_PUZZLES = ["sudoku_16x16", "sudoku_25x25"]
+SELECTIONS = [fps, tournament, ranking]
+CROSSOVERS = [cycle_co, pmx_co]
+MUTATIONS = [swap_mutation, inversion_mutation]
+
+
+def run_case(puzzle, select, crossover, mutate, seed, size, gens, max_seconds, presolve, max_gens=None):
+    """ Solves one puzzle with one combination of operators and one seed, restarting the population until it is solved
+    or the time budget (or the budget of max_gens generations over all the restarts) runs out. Returns if it was
+    solved, the time, and the number of generations and evaluations """
+
+    rng = np.random.default_rng(seed)
+    start = perf_counter()
+    original_sudoku = Original(puzzle)
+    if presolve:
+        original_sudoku.presolve()
+
+    solution_found = 0
+    generations = 0
+    evaluations = 0
+    while not solution_found and perf_counter() - start < max_seconds:
+        if max_gens is not None and generations >= max_gens:
+            break
+        pop = Population(size, original_sudoku, "max", rng=rng)
+        # The last restart of a generation budget runs fewer generations, but it gets stuck at the same time as the
+        # others (the stagnation is always 10% of gens)
+        solution_found, history = pop.evolve(gens if max_gens is None else min(gens, max_gens - generations), select,
+                                             crossover, mutate, co_p=0.9, mu_p=0.1, elitism=0.1,
+                                             stagnation=int(0.1*gens))
+        generations += len(history)
+        evaluations += pop.evaluations
+    return bool(solution_found), perf_counter() - start, generations, evaluations
+
+
+def run_exact(puzzle, presolve):
+    """ Solves one puzzle with the exact solver. Returns the solution (the values of its cells, or None if there is no
+    solution) and the time """
+
+    start = perf_counter()
+    original_sudoku = Original(puzzle)
+    if presolve:
+        original_sudoku.presolve()
+    solution = solve_exact(original_sudoku)
+    return None if solution is None else solution._genome.tolist(), perf_counter() - start
+
+
+def run(args):
+    exact = {}
+    for name in args.puzzles:
+        solution, seconds = run_exact(getattr(puzzles, name), args.presolve)
+        exact[name] = {"solved": solution is not None, "seconds": seconds, "solution": solution}
+        print(f"{name:>9} {'exact':>10} solved={solution is not None} {seconds:8.4f}s")
+
+    cases = []
+    for name, select, crossover, mutate in itertools.product(args.puzzles, SELECTIONS, CROSSOVERS, MUTATIONS):
+        for seed in range(args.seeds):
+            options = (getattr(puzzles, name), select, crossover, mutate, seed, args.size, args.gens,
+                       args.max_seconds, args.presolve)
+            solved, seconds, generations, evaluations = run_case(*options)
+            # The peak memory is measured in a second run with the same seed, so that tracemalloc doesn't slow down the
+            # timed run. tracemalloc makes it slower, so it is bounded by the generations of the timed run instead of
+            # the time budget (with the same seed, it then does exactly the same work). Its generations are recorded
+            # next to the peak, so that it can be checked
+            peak_memory, memory_generations = None, None
+            if args.memory:
+                tracemalloc.start()
+                memory_generations = run_case(*options[:-2], float("inf"), args.presolve, max_gens=generations)[2]
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            case = {
+                "puzzle": name,
+                "select": select.__name__,
+                "crossover": crossover.__name__,
+                "mutate": mutate.__name__,
+                "seed": seed,
+                "solved": solved,
+                "seconds": seconds,
+                "generations": generations,
+                "evaluations": evaluations,
+                "evaluations_per_second": evaluations / seconds if seconds > 0 else None,
+                "peak_memory_bytes": peak_memory,
+                "memory_generations": memory_generations,
+            }
+            cases.append(case)
+            print(f"{name:>9} {select.__name__:>10} {crossover.__name__:>8} {mutate.__name__:>18} seed={seed} "
+                  f"solved={solved} {seconds:8.2f}s {generations:6d} gens {case['evaluations_per_second']:10.0f} "
+                  f"evals/s")
+
+    results = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "settings": {"seeds": args.seeds, "size": args.size, "gens": args.gens, "max_seconds": args.max_seconds,
+                     "presolve": args.presolve},
+        "exact": exact,
+        "cases": cases,
+    }
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=1)
+    print(f"Results written to {args.output}")
+
+
+def compare(base_path, new_path):
+    """ Prints, for each puzzle and combination of operators, the median time and evaluations per second of the two
+    result files, and the ratio between them """
+
+    def medians(path):
+        with open(path) as file:
+            results = json.load(file)
+        groups = {}
+        for case in results["cases"]:
+            key = (case["puzzle"], case["select"], case["crossover"], case["mutate"])
+            groups.setdefault(key, []).append(case)
+        return results.get("commit"), {key: (float(np.median([case["seconds"] for case in group])),
+                                             float(np.median([case["evaluations_per_second"] or 0 for case in group])))
+                                       for key, group in groups.items()}
+
+    base_commit, base = medians(base_path)
+    new_commit, new = medians(new_path)
+    print(f"base: {base_commit}  new: {new_commit}")
+    for key in sorted(set(base) & set(new)):
+        (base_seconds, base_rate), (new_seconds, new_rate) = base[key], new[key]
+        print(f"{' '.join(key):<55} {base_seconds:8.2f}s -> {new_seconds:8.2f}s "
+              f"(x{base_seconds / new_seconds if new_seconds else float('inf'):.2f})  "
+              f"{base_rate:10.0f} -> {new_rate:10.0f} evals/s")
+
+
+def _commit():
+    """ The commit that is being benchmarked (if we are in a git repository) """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puzzles", nargs="+", default=PUZZLES, choices=PUZZLES + BIG_PUZZLES)
+    parser.add_argument("--seeds", type=int, default=3, help="number of seeds per case (0, 1, ...)")
+    parser.add_argument("--size", type=int, default=100, help="number of individuals in the population")
+    parser.add_argument("--gens", type=int, default=200, help="generations of each restart")
+    parser.add_argument("--max-seconds", type=float, default=60, help="time budget of each case")
+    parser.add_argument("--presolve", action="store_true", help="apply Original.presolve before the GA")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="don't measure the peak memory")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files")
+    arguments = parser.parse_args()
+    if arguments.compare:
+        compare(*arguments.compare)
+    else:
+        run(arguments)
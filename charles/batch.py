@@ -0,0 +1,182 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from time import perf_counter
+
+import numpy as np
+
+from charles.charles_file import Original, Population
+from charles.exact import solve_exact
+from charles.selection import ranking
+from charles.crossover import pmx_co
+from charles.mutation import inversion_mutation
+
+
+def solve_batch(puzzles, output=None, workers=None, max_seconds=None, max_gens=None, presolve=True, size=100,
+                optim="max", gens=200, select=ranking, crossover=pmx_co, mutate=inversion_mutation, co_p=0.9, mu_p=0.1,
+                elitism=0.1, seed=None, local_search=None, fallback=False, restart=None, duplicates=None):
+    """
+    Solves many puzzles in a pool of processes, and yields the results as the puzzles are solved (so in completion
+    order, not in the order of the input). Each puzzle is restarted until it is solved or its budget runs out.
+    The input is read lazily and only a few puzzles per worker are in flight at any time, so the memory stays flat for
+    any number of puzzles.
+
+    Args:
+        puzzles (iterable): The puzzles, each one as a list with the values of its cells (81 for the 9x9 puzzles, 256
+            for the 16x16, ...), with 0's for the cells that are not known.
+        output (str): Path of a JSON Lines file where each result is written as soon as it arrives (optional).
+        workers (int): Number of processes. By default, one per core.
+        max_seconds (float): Time budget for each puzzle (None for no limit).
+        max_gens (int): Generation budget for each puzzle, over all its restarts (None for no limit).
+        presolve (bool): If we apply Original.presolve to each puzzle before the GA starts.
+        size, optim: The same as in Population.
+        gens, select, crossover, mutate, co_p, mu_p, elitism, local_search, restart, duplicates: The same as in
+            Population.evolve.
+        seed (int): The seed from which the independent RNG streams of the puzzles are spawned, in the order of the
+            input (None for a random one).
+        fallback (bool): If the puzzles that the GA didn't solve within their budget are solved with the exact solver
+            (see charles.exact).
+
+    Yields:
+        dict: The index of the puzzle in the input, if it was solved, the best solution found (the values of its
+        cells), its fitness, the number of generations and fitness evaluations, if the solution came from the exact
+        solver, the wall time in seconds, and the error that stopped the puzzle (None if there was none). A puzzle that
+        fails (for example, because it doesn't have the values of a square grid) only gives its own result with the
+        error, and the other puzzles keep being solved.
+    """
+
+    workers = workers or os.cpu_count()
+    puzzles = enumerate(puzzles)
+    seeds = np.random.SeedSequence(seed)
+    file = open(output, "w") if output is not None else None
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+
+            # The index of the puzzle that each future is solving (to report the errors of the process itself)
+            indexes = {}
+
+            def submit(batch):
+                futures = set()
+                for index, puzzle in batch:
+                    future = executor.submit(_solve_puzzle, index, list(puzzle), max_seconds, max_gens, presolve, size,
+                                             optim, gens, select, crossover, mutate, co_p, mu_p, elitism,
+                                             local_search, fallback, restart, duplicates, seeds.spawn(1)[0])
+                    indexes[future] = index
+                    futures.add(future)
+                return futures
+
+            # We keep 2 puzzles per worker in flight, so that the workers never wait for the next puzzle
+            running = submit(islice(puzzles, 2 * workers))
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                running |= submit(islice(puzzles, len(done)))
+                for future in done:
+                    index = indexes.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as error:
+                        # The process that was solving the puzzle failed (the errors of the puzzle itself are caught
+                        # by _solve_puzzle)
+                        result = _error_result(index, error, 0)
+                    if file is not None:
+                        file.write(json.dumps(result) + "\n")
+                        file.flush()
+                    yield result
+    finally:
+        if file is not None:
+            file.close()
+
+
+class _Deadline(object):
+    """ Behaves like a stop Event for Population.evolve, which is set when the time runs out """
+
+    def __init__(self, seconds):
+        self.end = perf_counter() + seconds
+
+    def is_set(self):
+        return perf_counter() >= self.end
+
+
+def _solve_puzzle(index, puzzle, max_seconds, max_gens, presolve, size, optim, gens, select, crossover, mutate, co_p,
+                  mu_p, elitism, local_search, fallback, restart, duplicates, seed):
+    """ Solves one puzzle (see _evolve_puzzle). If the puzzle fails, returns a result with the error, instead of
+    raising it, so that one bad puzzle doesn't stop the whole batch """
+
+    start = perf_counter()
+    try:
+        return _evolve_puzzle(index, puzzle, max_seconds, max_gens, presolve, size, optim, gens, select, crossover,
+                              mutate, co_p, mu_p, elitism, local_search, fallback, restart, duplicates, seed, start)
+    except Exception as error:
+        return _error_result(index, error, perf_counter() - start)
+
+
+def _error_result(index, error, wall_time):
+    """ The result of a puzzle that failed """
+    return {
+        "index": index,
+        "solved": False,
+        "solution": None,
+        "fitness": None,
+        "generations": 0,
+        "evaluations": 0,
+        "exact": False,
+        "wall_time": wall_time,
+        "error": f"{type(error).__name__}: {error}",
+    }
+
+
+def _evolve_puzzle(index, puzzle, max_seconds, max_gens, presolve, size, optim, gens, select, crossover, mutate, co_p,
+                   mu_p, elitism, local_search, fallback, restart, duplicates, seed, start):
+    """ Solves one puzzle, restarting the population until it is solved or its budget runs out """
+
+    # All the restarts of the puzzle share one generator
+    rng = np.random.default_rng(seed)
+    deadline = _Deadline(max_seconds) if max_seconds is not None else None
+
+    original_sudoku = Original(puzzle)
+    if presolve:
+        original_sudoku.presolve()
+
+    solution_found = 0
+    generations = 0
+    evaluations = 0
+    best_genome, best_fitness = None, None
+    while not solution_found:
+        if max_gens is not None and generations >= max_gens:
+            break
+        if deadline is not None and deadline.is_set():
+            break
+        pop = Population(size, original_sudoku, optim, rng=rng)
+        solution_found, history = pop.evolve(gens if max_gens is None else min(gens, max_gens - generations), select,
+                                             crossover, mutate, co_p, mu_p, elitism, stop=deadline,
+                                             local_search=local_search, restart=restart, duplicates=duplicates,
+                                             stagnation=int(0.1*gens))
+        generations += len(history)
+        evaluations += pop.evaluations
+
+        best = pop.best_positions(1)[0]
+        fitness = float(pop.fitnesses[best])
+        if best_fitness is None or (fitness > best_fitness if optim == "max" else fitness < best_fitness):
+            best_genome, best_fitness = pop.genomes[best].tolist(), fitness
+
+    # If the budget ran out before the GA found a solution, we can still solve the puzzle with the exact solver
+    exact = False
+    if fallback and not solution_found:
+        solution = solve_exact(original_sudoku)
+        if solution is not None:
+            solution_found, exact = 1, True
+            best_genome, best_fitness = solution._genome.tolist(), solution.fitness
+
+    return {
+        "index": index,
+        "solved": bool(solution_found),
+        "solution": best_genome,
+        "fitness": best_fitness,
+        "generations": generations,
+        "evaluations": evaluations,
+        "exact": exact,
+        "wall_time": perf_counter() - start,
+        "error": None,
+    }
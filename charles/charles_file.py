@@ -1,41 +1,282 @@
-from random import random, randint
+from functools import lru_cache
+from itertools import combinations
+from math import isqrt
+from time import perf_counter
 import numpy as np
-from copy import deepcopy
-from operator import attrgetter
 
-import heapq
+from charles.checkpoint import load_checkpoint, restore_rng
+from charles.diversity import genome_diversity, genome_hashes
+from charles.observers import GenerationStats
+from charles.profiling import NULL_PROFILER
+
+
+# The puzzles are grids of side x side cells, split into side grids of box x box cells (side = box * box). The classic
+# Sudoku has box = 3 and side = 9, but digits_mask also works with box = 4 (16x16), box = 5 (25x25), ...
+
+
+def box_size(side):
+    """ Returns the box size of a puzzle with the given side (raises an exception if the side is not a perfect square)
+    """
+    box = isqrt(side)
+    if box < 2 or box * box != side:
+        raise Exception(f"The side of the puzzle must be a perfect square (9, 16, 25, ...), not {side}.")
+    return box
+
+
+def value_dtype(side):
+    """ The smallest unsigned integer type that holds the values (and the digit counts) of a puzzle with the given side
+    """
+    return np.uint8 if side < 2 ** 8 else np.uint16
+
+
+def mask_dtype(side):
+    """ The smallest unsigned integer type that holds the candidate masks (one bit per digit) of a puzzle with the given
+    side """
+    if side <= 16:
+        return np.uint16
+    elif side <= 32:
+        return np.uint32
+    return np.uint64
+
+
+def all_digits(side):
+    """ The mask with the bits of all the digits of a puzzle with the given side """
+    return (1 << side) - 1
+
+
+def mask_digits(mask):
+    """ Returns the digits that a candidate mask contains, as a tuple """
+    digits = []
+    while mask:
+        # The lowest bit that is set is the smallest digit of the mask
+        bit = mask & -mask
+        digits.append(bit.bit_length())
+        mask ^= bit
+    return tuple(digits)
+
+
+@lru_cache(maxsize=None)
+def grid_units(box):
+    """ Returns the cells of each row, column and grid of a puzzle with the given box size, and, for each cell, the
+    other cells that share a row, a column or a grid with it (its peers) """
+    side = box * box
+    rows = [[(i, j) for j in range(side)] for i in range(side)]
+    columns = [[(i, j) for i in range(side)] for j in range(side)]
+    grids = [[(i + k // box, j + k % box) for k in range(side)] for i in range(0, side, box)
+             for j in range(0, side, box)]
+    peers = {(i, j): sorted(set(rows[i] + columns[j] + grids[box * (i // box) + j // box]) - {(i, j)})
+             for i in range(side) for j in range(side)}
+    return rows, columns, grids, peers
+
+
+def population_fitness(genomes):
+    """ A function to get the fitness of many possible solutions to the Sudoku puzzle at once
+        It gives exactly the same values as Individual.get_fitness, but instead of walking through every cell with
+        Python loops, it counts the digits of every row/column/grid of every individual with a few NumPy operations
+
+        Args:
+            genomes (np.ndarray): an array with shape (N, side, side) (or (N, side * side)), with the values of N
+                individuals.
+
+        Returns:
+            np.ndarray: an array with shape (N,), with the fitness of each one of the N individuals.
+    """
+
+    return counts_fitness(digit_counts(genomes))
+
+
+def digit_counts(genomes):
+    """ Counts how many times each digit appears in each row, column and grid of many individuals at once
+
+        Args:
+            genomes (np.ndarray): an array with shape (N, side, side), (N, side * side) or (side * side,), with the
+                values of N individuals (or of one).
+
+        Returns:
+            np.ndarray: an array with shape (N, 3, side, side) (see value_dtype for its type). counts[k, 0, i, d] is
+            the number of times that the digit d+1 appears in the row i of the individual k (1 is for the columns and
+            2 is for the grids).
+    """
+
+    genomes = np.asarray(genomes)
+    side = genomes.shape[-1] if genomes.ndim == 3 else isqrt(genomes.shape[-1])
+    box = box_size(side)
+    genomes = genomes.reshape(-1, side, side)
+    n = genomes.shape[0]
+
+    # For each cell of each individual, we get the index of its (individual, row/column/grid, digit) counter, and we
+    # count how many cells fall in each counter with bincount. This is the same as the row_count (and column_count,
+    # and grid_count) of get_fitness, and it costs the same for each cell whatever the side of the puzzle is. The
+    # empty cells (with 0's) are not counted
+    digits = genomes.astype(np.intp) - 1
+    filled = digits >= 0
+    rows = np.arange(side)[:, None]
+    columns = np.arange(side)[None, :]
+    individuals = np.arange(n)[:, None, None] * side
+    counts = np.empty((n, 3, side, side), dtype=value_dtype(side))
+    for kind, units in enumerate((rows, columns, box * (rows // box) + columns // box)):
+        index = ((individuals + units) * side + digits)[filled]
+        counts[:, kind] = np.bincount(index, minlength=n * side * side).reshape(n, side, side)
+    return counts
+
+
+def counts_fitness(counts):
+    """ Gets the fitness of one or many individuals from their digit counts (see digit_counts), without looking at
+    their values again
+
+        Args:
+            counts (np.ndarray): an array with shape (3, side, side) or (N, 3, side, side).
+
+        Returns:
+            float or np.ndarray: the fitness of the individual, or an array with the fitness of the N individuals.
+    """
+
+    counts = np.asarray(counts)
+    side = counts.shape[-1]
+    batch = counts.reshape(-1, 3, side, side)
+
+    row_sum = _units_sum(batch[:, 0])
+    column_sum = _units_sum(batch[:, 1])
+    grid_sum = _units_sum(batch[:, 2])
+
+    # The same rule as in get_fitness: if all the rows, columns and grids only have unique elements, the fitness is 1,
+    # otherwise it is the product between the column_sum and the grid_sum
+    solved = (np.trunc(row_sum) == 1) & (np.trunc(column_sum) == 1) & (np.trunc(grid_sum) == 1)
+    fitness = np.where(solved, 1.0, column_sum * grid_sum)
+    return float(fitness[0]) if counts.ndim == 3 else fitness
+
+
+def _units_sum(counts):
+    """ Receives the digit counts with shape (N, side, side) (individual, row/column/grid, digit) and returns the
+    row_sum (or column_sum, or grid_sum) of get_fitness for each individual """
+
+    # For each row/column/grid, we get the number of different values in the counts, which is the len(set(row_count))
+    # of get_fitness. We sort the counts of each unit and count the places where the value changes
+    ordered = np.sort(counts, axis=2)
+    distinct = 1 + (ordered[..., 1:] != ordered[..., :-1]).sum(axis=2)
+    scores = (1.0 / distinct) / counts.shape[2]
+
+    # We sum the scores one row/column/grid at a time (and not with scores.sum), so that the floating point additions
+    # are done in the same order as in get_fitness, and we get exactly the same values
+    total = np.zeros(scores.shape[0])
+    for unit in range(scores.shape[1]):
+        total += scores[:, unit]
+    return total
 
 
 class Individual(object):
-    """ An individual is a possible solution to the Sudoku puzzle """
+    """ An individual is a possible solution to the Sudoku puzzle
+
+        The values and the fitness of an individual are views into one row of the genome buffer and of the fitness
+        vector of a population (or into its own small arrays, when the individual doesn't belong to a population).
+        An individual can also keep the digit counts of its rows/columns/grids (see digit_counts), which the mutation
+        operators update cell by cell, so that the fitness can be recomputed without scanning the whole grid.
+        The dirty flag says if the values changed since the fitness was last calculated. It is only set by the
+        crossover (new individuals start dirty), by the mutation and by __setitem__, and the population only evaluates
+        the individuals that are dirty.
+        The offspring of an individual (see share) are copy-on-write: they use the arrays of their parent until they
+        are changed for the first time, and only then they get their own copy. So the offspring that are never changed
+        cost no copies, and changing an offspring never changes its parent.
+    """
 
-    def __init__(self):
-        self.values = np.zeros((9, 9), dtype=int)
-        self.fitness = None
+    __slots__ = ("_genome", "_fitness", "counts", "dirty", "_shared")
+
+    def __init__(self, genome=None, fitness=None, counts=None):
+        # The genome is a 1D array with the side * side values of the grid (81 by default, until other values are
+        # given), and the fitness is a 1D array with 1 element (NaN means that the fitness was not calculated yet)
+        self._genome = np.zeros(81, dtype=np.uint8) if genome is None else genome
+        self._fitness = np.full(1, np.nan) if fitness is None else fitness
+        # None means that we are not keeping the digit counts of the individual
+        self.counts = counts
+        self.dirty = True
+        # If the arrays are shared with another individual (and have to be copied before they are changed)
+        self._shared = False
         return
 
+    def share(self, counts=True):
+        """ Returns a copy-on-write copy of the individual (for example, an offspring that starts as a copy of its
+        parent), that shares the values, the fitness and (if counts is True) the digit counts of the individual until
+        it is changed. The individual itself must not be changed while it has offspring that weren't changed yet (in
+        evolve, the parents of a generation are never changed) """
+        offspring = Individual(self._genome, self._fitness, self.counts if counts else None)
+        offspring.dirty = self.dirty
+        offspring._shared = True
+        return offspring
+
+    def _own(self, keep_values=True):
+        """ Called before the individual is changed: if its arrays are shared, it gets its own copy of them (without
+        copying the values, if they are all going to be replaced) """
+        if self._shared:
+            self._genome = self._genome.copy() if keep_values else np.empty_like(self._genome)
+            self._fitness = self._fitness.copy()
+            if self.counts is not None:
+                self.counts = self.counts.copy()
+            self._shared = False
+
+    @property
+    def values(self):
+        """ The values of the individual, as a side x side view of its genome """
+        side = isqrt(self._genome.size)
+        return self._genome.reshape(side, side)
+
+    @values.setter
+    def values(self, values):
+        values = np.ravel(values)
+        self._own(keep_values=False)
+        # An individual that doesn't have a genome of the right size yet (for example, a new individual that gets the
+        # values of a 16x16 puzzle) gets a new one
+        if values.size != self._genome.size:
+            self._genome = np.zeros(values.size, dtype=value_dtype(isqrt(values.size)))
+        self._genome[:] = values
+        self.dirty = True
+        # The whole grid changed, so if we are keeping the digit counts, we need to count them again
+        if self.counts is not None:
+            self.counts[:] = digit_counts(self._genome)[0]
+
+    @property
+    def fitness(self):
+        fitness = self._fitness[0]
+        return None if np.isnan(fitness) else float(fitness)
+
+    @fitness.setter
+    def fitness(self, fitness):
+        if self._shared:
+            self._fitness = self._fitness.copy()
+        self._fitness[0] = np.nan if fitness is None else fitness
+
     def get_fitness(self):
         """ A function to get the fitness for each possible solution to the Sudoku puzzle
             The fitness of an individual is calculated by (...)
             So, the higher the fitness, the better. The real solution to the puzzle will have a fitness of 1, and it
             will be a 9x9 grid of numbers, where in each row/column/grid we have the numbers 1 to 9, without duplicates
+            (or a side x side grid with the numbers 1 to side, for the bigger puzzles)
 
             Returns:
                 float: the product between the column_sum and the grid_sum, as explained bellow, in the examples in the
                 comments. The higher the fitness, the better the solution.
         """
 
-        row_count = np.zeros(9)
-        column_count = np.zeros(9)
-        grid_count = np.zeros(9)
+        # If we are keeping the digit counts of the individual, we can get the fitness directly from them, without
+        # scanning all the cells again
+        if self.counts is not None:
+            self.fitness = counts_fitness(self.counts)
+            self.dirty = False
+            return
+
+        # The examples in the comments are for the 9x9 puzzles, in which the side is 9 and each grid has 3x3 cells
+        side = len(self.values)
+        box = box_size(side)
+        row_count = np.zeros(side)
+        column_count = np.zeros(side)
+        grid_count = np.zeros(side)
         row_sum = 0
         column_sum = 0
         grid_sum = 0
 
         # We will iterate through the 9 rows
-        for i in range(0, 9):
+        for i in range(0, side):
             # And we will iterate through the 9 columns inside each row
-            for j in range(0, 9):
+            for j in range(0, side):
                 # Example:
                 #    If we have a "7" on the 5th column of the 3rd row, we will go to the 6th (7-1) position of the
                 #    row_count array, and we will sum 1 (because we found 1 more time the number 7) to the number that
@@ -45,47 +286,33 @@ class Individual(object):
             # The higher the row_sum, the better. In the perfect scenario, in which we had each number just 1 time in
             # each row, after iterating for each one of the 9 rows, we would sum 0.1111111111111111. After the 9 rows,
             # the row_sum would be 1.
-            row_sum += (1.0 / len(set(row_count))) / 9
+            row_sum += (1.0 / len(set(row_count))) / side
             # After each row, we restart the row_count
-            row_count = np.zeros(9)
+            row_count = np.zeros(side)
 
         # We will iterate through the 9 columns
-        for i in range(0, 9):
+        for i in range(0, side):
             # And we will iterate through the 9 rows inside each column
-            for j in range(0, 9):
+            for j in range(0, side):
                 # The logic is the same as explained above, but this time is for the columns
                 column_count[self.values[j][i] - 1] += 1
             # The logic is the same as explained above, but this time is for the columns
-            column_sum += (1.0 / len(set(column_count))) / 9
+            column_sum += (1.0 / len(set(column_count))) / side
             # After each column, we restart the column_count
-            column_count = np.zeros(9)
+            column_count = np.zeros(side)
 
         # We will iterate through the 9 blocks (each block has 3 rows --> we will go from row 0 to 8, with steps of 3)
-        for i in range(0, 9, 3):
+        for i in range(0, side, box):
             # Each block has 3 columns --> we will go from column 0 to 8, with steps of 3
-            for j in range(0, 9, 3):
-                # Doing the same as above, for the first row/column of the grid
-                grid_count[self.values[i][j] - 1] += 1
-                # Doing the same as above, for the first row and second column of the grid
-                grid_count[self.values[i][j + 1] - 1] += 1
-                # Doing the same as above, for the first row and third column of the grid
-                grid_count[self.values[i][j + 2] - 1] += 1
-                # Doing the same as above, for the second row and first column of the grid
-                grid_count[self.values[i + 1][j] - 1] += 1
-                # Doing the same as above, for the second row and second column of the grid
-                grid_count[self.values[i + 1][j + 1] - 1] += 1
-                # Doing the same as above, for the second row and third column of the grid
-                grid_count[self.values[i + 1][j + 2] - 1] += 1
-                # Doing the same as above, for the third row and first column of the grid
-                grid_count[self.values[i + 2][j] - 1] += 1
-                # Doing the same as above, for the third row and second column of the grid
-                grid_count[self.values[i + 2][j + 1] - 1] += 1
-                # Doing the same as above, for the third row and third column of the grid
-                grid_count[self.values[i + 2][j + 2] - 1] += 1
+            for j in range(0, side, box):
+                # Doing the same as above, for each one of the cells of the grid. The cell k of the grid is in its row
+                # k // 3 and column k % 3 (the first row/column of the grid is the 0, the second is the 1, ...)
+                for k in range(0, side):
+                    grid_count[self.values[i + k // box][j + k % box] - 1] += 1
 
                 # We will do the same as we did above
-                grid_sum += (1.0 / len(set(grid_count))) / 9
-                grid_count = np.zeros(9)
+                grid_sum += (1.0 / len(set(grid_count))) / side
+                grid_count = np.zeros(side)
 
         # Next, we will calculate the fitness for the individual itself
         # If we got only unique elements in the rows, in the columns, and in the grids, the fitness will be 1, and we
@@ -99,6 +326,7 @@ class Individual(object):
             fitness = column_sum * grid_sum
 
         self.fitness = fitness
+        self.dirty = False
         return
 
     def __len__(self):
@@ -110,23 +338,189 @@ class Individual(object):
 
     def __setitem__(self, tup, value):
         x, y = tup
+        self._own()
+        if self.counts is not None:
+            self._move_count(x, y, self.values[x][y], value)
         self.values[x][y] = value
+        self.dirty = True
+
+    def swap_cells(self, row, column1, column2):
+        """ Swaps the values of 2 cells in the same row, updating the digit counts (if we are keeping them) only for
+        the 2 columns and the (at most) 2 grids that changed. The counts of the row don't change with a swap. """
+        value1, value2 = self.values[row][column1], self.values[row][column2]
+        # Swapping 2 equal values changes nothing (and doesn't need a copy of a shared genome)
+        if value1 != value2:
+            self._own()
+            self.values[row][column1], self.values[row][column2] = value2, value1
+            self.dirty = True
+            if self.counts is not None:
+                self._move_count(row, column1, value1, value2, rows=False)
+                self._move_count(row, column2, value2, value1, rows=False)
+
+    def set_row(self, row, values):
+        """ Replaces the values of a row, updating the digit counts (if we are keeping them) only for the cells that
+        changed """
+        values = np.asarray(values, dtype=self._genome.dtype)
+        side = isqrt(self._genome.size)
+        current = self._genome[row * side:(row + 1) * side]
+        changed = current != values
+        # If the row stays the same, a shared genome doesn't need to be copied
+        if not changed.any():
+            return
+        self._own()
+        if self.counts is not None:
+            for column in np.flatnonzero(changed):
+                self._move_count(row, column, current[column], values[column])
+        self._genome[row * side:(row + 1) * side] = values
+        self.dirty = True
+
+    def _move_count(self, row, column, old_value, new_value, rows=True):
+        """ Updates the digit counts after the cell (row, column) changed from old_value to new_value """
+        box = isqrt(self.counts.shape[-1])
+        grid = box * (row // box) + column // box
+        for kind, unit in ((0, row), (1, column), (2, grid))[0 if rows else 1:]:
+            self.counts[kind, unit, old_value - 1] -= 1
+            self.counts[kind, unit, new_value - 1] += 1
 
     def __repr__(self):
         return f"Individual(size={self.values.size}); Fitness: {self.fitness}; Values: \n{self.values}"
 
 
 class Original(Individual):
-    """ The values that are known at the beginning of the Sudoku puzzle """
+    """ The values that are known at the beginning of the Sudoku puzzle
+
+        The original puzzle also keeps the candidates of each cell, as masks with one bit per digit: the bit d-1 of
+        candidates[i, j] is set if the digit d can be placed in the row i and column j (for the given cells, only the
+        given digit is set), and the context that the operators use to know which cells they can change (see
+        PuzzleContext).
+        The values can be a side x side grid, or a list with the side * side values of the grid (like the puzzles in
+        puzzles.py), for any side that is a perfect square (9, 16, 25, ...).
+    """
 
     def __init__(self, values):
-        self.values = values
+        super().__init__()
+        values = np.asarray(values)
+        side = isqrt(values.size)
+        if values.ndim not in (1, 2) or side * side != values.size:
+            raise Exception("The puzzle must be a square grid, or a list with the values of a square grid.")
+        # The side of the grid and the side of each one of its grids (the box)
+        self.box = box_size(side)
+        self.side = side
+        self.values = values.reshape(side, side)
+        self.build_candidates()
+        self.context = PuzzleContext(self.values, self.candidates)
+        return
+
+    def build_candidates(self):
+        """ Builds the candidate masks of every cell in one pass, from the masks of the digits that are already used in
+        each row, column and grid """
+        box, dtype = self.box, mask_dtype(self.side)
+        values = self.values.astype(dtype)
+        # The bit of each given digit (and 0 for the empty cells)
+        bits = np.where(values > 0, np.left_shift(dtype(1), np.maximum(values, 1) - 1), 0).astype(dtype)
+        row_mask = np.bitwise_or.reduce(bits, axis=1)
+        column_mask = np.bitwise_or.reduce(bits, axis=0)
+        grid_mask = np.bitwise_or.reduce(np.bitwise_or.reduce(bits.reshape(box, box, box, box), axis=3), axis=1)
+        # A digit is a candidate for an empty cell if it isn't used in the row, nor in the column, nor in the grid
+        used = row_mask[:, None] | column_mask[None, :] | np.repeat(np.repeat(grid_mask, box, axis=0), box, axis=1)
+        self.candidates = np.where(values > 0, bits, ~used & dtype(all_digits(self.side))).astype(dtype)
         return
 
+    def presolve(self):
+        """ Fixes the cells that can be deduced with constraint propagation, before the GA starts. We apply naked
+        singles, hidden singles and box/line reductions until nothing changes. The fixed cells are written into the
+        values of the original puzzle, so they are treated as givens by the initialization of the population and by the
+        operators.
+
+            Returns:
+                tuple: the number of cells that were fixed, and the time that the presolve took (in seconds).
+        """
+
+        start = perf_counter()
+        # We work on Python lists, which are faster than NumPy arrays for accessing one cell at a time
+        values = self.values.tolist()
+        candidates = self.candidates.tolist()
+        rows, columns, grids, peers = grid_units(self.box)
+        side, box, digits_mask = self.side, self.box, all_digits(self.side)
+        fixed = 0
+
+        def place(row, column, digit):
+            """ Fixes the digit in the cell, and removes it from the candidates of its peers """
+            values[row][column] = digit
+            bit = 1 << (digit - 1)
+            candidates[row][column] = bit
+            for i, j in peers[(row, column)]:
+                if values[i][j] == 0:
+                    candidates[i][j] &= digits_mask ^ bit
+
+        def eliminate(cells, bit):
+            """ Removes the bit from the candidates of the empty cells, and tells if any of them changed """
+            changed = False
+            for i, j in cells:
+                if values[i][j] == 0 and candidates[i][j] & bit:
+                    candidates[i][j] &= digits_mask ^ bit
+                    changed = True
+            return changed
+
+        changed = True
+        while changed:
+            changed = False
+
+            # Naked singles: an empty cell with only one candidate
+            for row in range(side):
+                for column in range(side):
+                    if values[row][column] == 0 and candidates[row][column].bit_count() == 1:
+                        place(row, column, candidates[row][column].bit_length())
+                        fixed += 1
+                        changed = True
+
+            # Hidden singles: a digit that can only go to one cell of a row, column or grid
+            for unit in rows + columns + grids:
+                for digit in range(1, side + 1):
+                    bit = 1 << (digit - 1)
+                    cells = [(i, j) for i, j in unit if candidates[i][j] & bit]
+                    if len(cells) == 1 and values[cells[0][0]][cells[0][1]] == 0:
+                        place(cells[0][0], cells[0][1], digit)
+                        fixed += 1
+                        changed = True
+
+            # Box/line reductions: if the empty cells of a grid that can have a digit are all in the same row (or
+            # column), the digit can't go anywhere else in that row (or column). And if the empty cells of a row (or
+            # column) that can have a digit are all in the same grid, the digit can't go anywhere else in that grid.
+            for digit in range(1, side + 1):
+                bit = 1 << (digit - 1)
+                for grid in grids:
+                    cells = [(i, j) for i, j in grid if values[i][j] == 0 and candidates[i][j] & bit]
+                    if not cells:
+                        continue
+                    if len({i for i, _ in cells}) == 1:
+                        changed |= eliminate([cell for cell in rows[cells[0][0]] if cell not in grid], bit)
+                    if len({j for _, j in cells}) == 1:
+                        changed |= eliminate([cell for cell in columns[cells[0][1]] if cell not in grid], bit)
+                for line in rows + columns:
+                    cells = [(i, j) for i, j in line if values[i][j] == 0 and candidates[i][j] & bit]
+                    line_grids = {box * (i // box) + j // box for i, j in cells}
+                    if len(line_grids) == 1:
+                        changed |= eliminate([cell for cell in grids[line_grids.pop()] if cell not in line], bit)
+
+        self.values = values
+        self.candidates = np.array(candidates, dtype=mask_dtype(side))
+        # The fixed cells are now givens, so the operators need a new context
+        self.context = PuzzleContext(self.values, self.candidates)
+        return fixed, perf_counter() - start
+
+    def candidate_mask(self, row, column):
+        """ Returns the candidate mask of a cell """
+        return int(self.candidates[row, column])
+
+    def candidates_of(self, row, column):
+        """ Returns the digits that can be placed in a cell, as a tuple """
+        return mask_digits(int(self.candidates[row, column]))
+
     def duplicated_in_row(self, row, value):
         """ This checks if there are duplicated values in a certain row """
         # We will iterate, for the specific row, through the columns
-        for column in range(0, 9):
+        for column in range(0, self.side):
             # If the value exists in any of the columns in that row, we will return "True", which means that there are
             # duplicated values in the row
             if self.values[row][column] == value:
@@ -137,7 +531,7 @@ class Original(Individual):
     def duplicated_in_column(self, column, value):
         """ This checks if there are duplicated values in a certain column """
         # We will iterate, for the specific column, through the rows
-        for row in range(0, 9):
+        for row in range(0, self.side):
             # If the value exists in any of the rows in that column, we will return "True", which means that there are
             # duplicated values in the column
             if self.values[row][column] == value:
@@ -151,21 +545,13 @@ class Original(Individual):
         # If row = 3 --> i = 3          # If row = 4 --> i = 3          # If row = 5 --> i = 3
         # If row = 6 --> i = 6          # If row = 7 --> i = 6          # If row = 8 --> i = 6
         # This will allow us to get the first row (and the same happens for the columns) of the grids (which start in
-        # the rows with index 0, 3 and 6)
-        i = 3 * (int(row / 3))
-        j = 3 * (int(column / 3))
+        # the rows with index 0, 3 and 6). In the bigger puzzles, the grids start in the multiples of the box size
+        i = self.box * (row // self.box)
+        j = self.box * (column // self.box)
 
         # If the value exists in any of the positions of that grid, we will return "True", which means that there are
         # duplicated values in the grid
-        if ((self.values[i][j] == value)
-                or (self.values[i][j + 1] == value)
-                or (self.values[i][j + 2] == value)
-                or (self.values[i + 1][j] == value)
-                or (self.values[i + 1][j + 1] == value)
-                or (self.values[i + 1][j + 2] == value)
-                or (self.values[i + 2][j] == value)
-                or (self.values[i + 2][j + 1] == value)
-                or (self.values[i + 1][j + 2] == value)):
+        if (self.values[i:i + self.box, j:j + self.box] == value).any():
             return True
         else:
             return False
@@ -174,227 +560,562 @@ class Original(Individual):
         return f"Original Puzzle: {self.values}"
 
 
+class PuzzleContext(object):
+    """ What the crossover and mutation operators need to know about the puzzle that is being solved, precomputed once
+    per Original. Since the operators receive it as an argument, several puzzles can be solved at the same time in one
+    process. """
+
+    def __init__(self, givens, candidates):
+        # The side of the puzzle and of its grids
+        self.side = len(givens)
+        self.box = box_size(self.side)
+        # The given values, and a mask with the cells that were given (and that the operators can't change)
+        self.givens = np.array(givens, dtype=value_dtype(self.side))
+        # The candidate masks of the cells (see Original)
+        self.candidates = np.array(candidates, dtype=mask_dtype(self.side))
+        self.fixed = self.givens != 0
+        # For each row, the indexes of the columns that weren't given
+        self.free_columns = tuple(tuple(int(j) for j in np.flatnonzero(~self.fixed[i])) for i in range(self.side))
+        # The positions of the cells that weren't given, in the flat genomes
+        self.free_cells = np.flatnonzero(~self.fixed.ravel())
+        # Every swap of 2 free cells in the same row, as an (M, 3) array of (row, column1, column2), for the local
+        # search (see charles.local_search)
+        self.swaps = np.array([(i, j1, j2) for i in range(self.side)
+                               for j1, j2 in combinations(self.free_columns[i], 2)], dtype=np.intp).reshape(-1, 3)
+        # How the free cells of each row are sampled (see row_sampling), worked out the first time that the row is
+        # sampled and then reused by every population of the puzzle
+        self._row_sampling = {}
+        return
+
+    def row_sampling(self, i):
+        """ Returns how the free cells of the row i are sampled (see Population.sample_genomes): the digits that are
+        missing in the row, the candidate masks of its free cells, the fraction of the random permutations of the
+        missing digits in which every cell gets one of its candidates (measured once, with 4096 permutations), and
+        the list of all the legal assignments of the row if that fraction is small (None if there are too many to list
+        them, see _row_assignments). It doesn't use the RNG of the populations, so the same seed always gives the same
+        genomes """
+        if i not in self._row_sampling:
+            free = np.array(self.free_columns[i], dtype=np.intp)
+            missing = np.setdiff1d(np.arange(1, self.side + 1, dtype=self.givens.dtype), self.givens[i])
+            masks = self.candidates[i, free]
+            attempts = np.random.default_rng(i).permuted(np.tile(missing, (4096, 1)), axis=1)
+            rate = float(((masks >> (attempts - 1).astype(masks.dtype)) & 1).all(axis=1).mean())
+            assignments = _row_assignments(missing, masks) if rate < 0.1 else None
+            self._row_sampling[i] = (missing, masks, rate, assignments)
+        return self._row_sampling[i]
+
+    def __repr__(self):
+        return f"PuzzleContext(side={self.side}, free_cells={int((~self.fixed).sum())})"
+
+
 class Population(object):
     """ The population is a set of possible solutions (individuals) to the Sudoku puzzle """
 
-    def __init__(self, size, original_sudoku, optim, tournament_size=0.2):
-        self.individuals = []
+    def __init__(self, size, original_sudoku, optim, tournament_size=0.2, observers=(), rng=None, checkpoint=None,
+                 profile=None):
         self.size = size
         self.optim = optim
+        # The random number generator of the population, that is also passed to the selection, crossover and mutation
+        # operators. It can be a NumPy Generator, a seed or a SeedSequence (so parallel runs can use independent
+        # streams), or None for a random seed
+        self.rng = np.random.default_rng(rng)
+        # The context of the puzzle, that we pass to the crossover and mutation operators
+        self.context = original_sudoku.context
+        # The tables that the selection functions build once per generation (they are discarded every time that the
+        # fitness of the individuals changes)
+        self.selection_tables = {}
+        # The number of fitness evaluations that were performed, and, for each generation, how many evaluations we
+        # saved by not evaluating again the individuals that didn't change
+        self.evaluations = 0
+        self.evaluations_saved = []
+        # For each generation, how many duplicated offspring were replaced by new individuals, and how many reused the
+        # fitness of the first copy (see the duplicates argument of evolve)
+        self.duplicates_rejected = []
+        self.duplicates_reused = []
         self.tournament_size = tournament_size
+        # The observers that are notified by evolve (see charles.observers). Without observers, evolve doesn't even
+        # build the statistics of the generations
+        self.observers = list(observers)
+        # The state of evolve: the generation that it is in, how many generations the best fitness didn't improve, the
+        # fitness of the best individual of each generation, how many times the restart policy restarted it, and the
+        # mutation probability of the next generations (a restart policy can raise it while we are stuck, and None
+        # means the mu_p argument of evolve)
+        self.generation = 0
+        self.stopped_fitness = 0
+        self.history = []
+        self.restarts = 0
+        self.mutation_p = None
+        # The profiler that measures the time and memory of the initialization and of each phase of evolve (see
+        # charles.profiling). By default, nothing is measured
+        self.profile = profile if profile is not None else NULL_PROFILER
 
-        # We will get the legal values that each cell on the Sudoku puzzle can receive
-        legal = Individual()
-        legal.values = [[[] for _ in range(0, 9)] for _ in range(0, 9)]
-        # We will iterate from the first (with index = 0) to the last (with index = 8) row
-        for row in range(0, 9):
-            # We will iterate from the first (with index = 0) to the last (with index = 8) column
-            for column in range(0, 9):
-                # We will iterate from the first (with value = 1) to the last (with value = 9) possible value
-                for value in range(1, 10):
-                    # We will check some conditions in the original data, to see if the value is available or given
-                    # The conditions for being available are:
-                    #   1. In the original data, in the same position, we have a 0 (AND);
-                    #   2. (using the property --> "NOT(A or B)" is equal to "NOT A AND NOT B")
-                    #     2.1. The value doesn't exist in that column, in the original data (AND)
-                    #     2.2. The value doesn't exist in that grid (3x3), in the original data (AND)
-                    #     2.3. The value doesn't exist in that row, in the original data
-                    if ((original_sudoku.values[row][column] == 0) and
-                            not (original_sudoku.duplicated_in_column(column, value)
-                                 or original_sudoku.duplicated_in_grid(row, column, value)
-                                 or original_sudoku.duplicated_in_row(row, value))):
-                        # The value is available
-                        legal.values[row][column].append(value)
-                    elif original_sudoku.values[row][column] != 0:
-                        legal.values[row][column].append((original_sudoku.values[row][column]))
-        # Next, we are going to append individuals to the population
-        for _ in range(size):
-            # We will initialize 1 candidate (=individual) at a time
-            candidate = Individual()
-            # We will create the candidate row by row
-            for i in range(0, 9):
-                # The row is going to start as nine 0's
-                row = np.zeros(9)
-                # Then, we will fill the cells in that row
-                for j in range(0, 9):
-                    # If the value in that combination row/column was given, we will take it
-                    if original_sudoku.values[i][j] != 0:
-                        row[j] = original_sudoku.values[i][j]
-                    # If the value in that position wasn't given, we will select one randomly from the legal values for
-                    # that same position
-                    elif original_sudoku.values[i][j] == 0:
-                        row[j] = legal.values[i][j][randint(0, len(legal.values[i][j]) - 1)]
-                # We can't have duplicate values in the row, so we will try again until we have a valid row
-                while len(list(set(row))) != 9:
-                    for j in range(0, 9):
-                        if original_sudoku.values[i][j] == 0:
-                            row[j] = legal.values[i][j][randint(0, len(legal.values[i][j]) - 1)]
-                # Finally, we have the row with index i of the candidate (and we do this 9 times, for the 9 rows)
-                candidate.values[i] = row
-            # When we have all the cells of the candidate, we append it to the population
-            self.individuals.append(candidate)
-
-        # After having all the individuals in the population, we are going to calculate their fitness
-        self.calculate_fitness()
+        # If we are given the path of a checkpoint (see charles.checkpoint), the population continues from the state
+        # that was saved there (and evolve can continue from it, with resume=True)
+        if checkpoint is not None:
+            with self.profile.phase("initialization"):
+                self.restore(checkpoint)
+            self.profile.close()
+            return
 
-        print("All individuals were created!")
+        with self.profile.phase("initialization"):
+            # The values of all the individuals are stored in one contiguous (N, side * side) array, and their fitness
+            # in a vector. The individuals are sampled with the legal values that each cell on the Sudoku puzzle can
+            # receive (see sample_genomes)
+            self.genomes = self.sample_genomes(size)
+            self.fitnesses = np.full(size, np.nan)
+            self.counts = np.zeros((size, 3, self.context.side, self.context.side), dtype=self.genomes.dtype)
+            self.individuals = [Individual(self.genomes[k], self.fitnesses[k:k + 1]) for k in range(size)]
+
+            # After having all the individuals in the population, we are going to count their digits and calculate
+            # their fitness
+            self.count_digits(range(size))
+            self.calculate_fitness()
+        # The profiler doesn't trace the memory between the initialization and evolve
+        self.profile.close()
         return
 
-    def calculate_fitness(self):
-        """ To update the fitness of every individual in the population """
+    def restore(self, path):
+        """ Restores the genomes, fitness, RNG state and evolve state of the population from a checkpoint. The genomes
+        stay memory-mapped (copy-on-write) until the first generation replaces them, but they are all read once here,
+        to count their digits (the digit counts are not saved in the checkpoint) """
+        state = load_checkpoint(path)
+        if state["size"] != self.size or state["genomes"].shape[1] != self.context.side ** 2:
+            raise Exception(f"The checkpoint {path} is for a different population size or puzzle.")
+        # The fitness of the checkpoint only means the same if we are optimizing in the same direction
+        if state["optim"] != self.optim:
+            raise Exception(f"The checkpoint {path} is for optim={state['optim']!r}, not {self.optim!r}.")
+        self.rng = restore_rng(state["rng_state"])
+        self.generation = state["generation"]
+        self.stopped_fitness = state["stopped_fitness"]
+        self.history = state["history"].tolist()
+        self.restarts = state["restarts"]
+        # The checkpoints saved before the mutation probability was saved continue with the mu_p argument of evolve
+        self.mutation_p = state.get("mutation_p")
+        self.evaluations = state["evaluations"]
+
+        self.genomes = state["genomes"]
+        self.fitnesses = np.array(state["fitnesses"])
+        self.counts = np.zeros((self.size, 3, self.context.side, self.context.side), dtype=self.genomes.dtype)
+        self.individuals = [Individual(self.genomes[k], self.fitnesses[k:k + 1]) for k in range(self.size)]
+        # The digit counts were not saved (they can be counted again from the genomes), but the fitness was
+        self.count_digits(range(self.size))
         for individual in self.individuals:
-            individual.get_fitness()
+            individual.dirty = False
+        return
+
+    def calculate_fitness(self, reuse_duplicates=False):
+        """ To update the fitness of every individual in the population
+
+            Args:
+                reuse_duplicates (bool): If the individuals that are copies of another individual (see find_duplicates)
+                    get the fitness of the first copy, instead of being evaluated.
+
+            Returns:
+                int: the number of individuals that were evaluated.
+        """
+        # Only the individuals that changed since their fitness was calculated (the dirty ones) need to be evaluated
+        dirty = [k for k, individual in enumerate(self.individuals) if individual.dirty]
+        evaluate, copies = dirty, []
+        # The first copy of a genome is either evaluated now or was already evaluated, so the other copies can take its
+        # fitness
+        if dirty and reuse_duplicates:
+            first = self.find_duplicates()
+            evaluate = [k for k in dirty if first[k] == k]
+            copies = [k for k in dirty if first[k] != k]
+        # The digit counts of every individual are always up to date (the mutation operators update them cell by cell),
+        # so we evaluate them all at once from the counts, without scanning the grids again
+        if evaluate:
+            self.fitnesses[evaluate] = counts_fitness(self.counts[evaluate])
+        if copies:
+            self.fitnesses[copies] = self.fitnesses[first[copies]]
+        if dirty:
+            self.selection_tables = {}
+        for k in dirty:
+            self.individuals[k].dirty = False
+        self.evaluations += len(evaluate)
+        return len(evaluate)
+
+    def find_duplicates(self):
+        """ Returns, for each individual, the position of the first individual with the same genome (its own position,
+        if it is the first one). The genomes are grouped by their hashes (see charles.diversity.genome_hashes), and
+        then compared with the first genome of their group, in case 2 different genomes have the same hash """
+        _, first, inverse = np.unique(genome_hashes(self.genomes), return_index=True, return_inverse=True)
+        first = first[inverse.ravel()]
+        equal = (self.genomes == self.genomes[first]).all(axis=1)
+        return np.where(equal, first, np.arange(len(first)))
+
+    def reject_duplicates(self):
+        """ Replaces the individuals that are copies of another individual by new random individuals (see
+        sample_genomes), which are evaluated with the others. Returns the number of individuals that were replaced """
+        copies = np.flatnonzero(self.find_duplicates() != np.arange(len(self.individuals)))
+        if len(copies):
+            self.genomes[copies] = self.sample_genomes(len(copies))
+            for k in copies:
+                self.individuals[k].dirty = True
+            self.count_digits(copies)
+        return len(copies)
+
+    def sample_genomes(self, n):
+        """ Samples n random genomes, as an (n, side * side) array. The given cells keep their values, and the free
+        cells of each row get a random permutation of the digits that are missing in the row, trying again until each
+        cell only has one of its legal values (its candidates). This gives the same rows as picking a random legal
+        value for each free cell and trying again until the row has no duplicates, but many more attempts succeed, and
+        all the attempts for one row of all the individuals are done at once. In the rows where less than 10% of the
+        attempts succeed, the rows are drawn from the list of all the legal assignments of the row instead (see
+        _row_assignments), which gives the same distribution as the attempts. Only when such a row has too many legal
+        assignments to list them (which can happen in the bigger puzzles, where the rows have many free cells), the
+        rows are built with a randomized search (see _sample_row), which is not uniform. Which rows are sampled in each
+        way, and their lists of assignments, are worked out once per puzzle (see PuzzleContext.row_sampling)
+        """
+
+        context = self.context
+        side = context.side
+        genomes = np.empty((n, side, side), dtype=context.givens.dtype)
+        genomes[:] = context.givens
+        for i in range(side):
+            free = np.array(context.free_columns[i], dtype=np.intp)
+            if len(free) == 0:
+                continue
+            # The digits that are missing in the row, the candidate masks of the free cells, the fraction of the
+            # attempts that succeed and the legal assignments of the row (if few attempts succeed)
+            missing, masks, rate, assignments = context.row_sampling(i)
+            rows = []
+            accepted = 0
+            if rate >= 0.1:
+                while accepted < n:
+                    # We make enough attempts to get the rows that are missing (with some margin)
+                    attempts = self.rng.permuted(np.tile(missing, (min(65536, int(1.2 * (n - accepted) / rate) + 16),
+                                                                   1)), axis=1)
+                    # An attempt is valid if the bit of the value of each cell is set in the candidate mask of the cell
+                    valid = attempts[((masks >> (attempts - 1).astype(masks.dtype)) & 1).all(axis=1)]
+                    rows.append(valid)
+                    accepted += len(valid)
+            elif assignments is not None and len(assignments):
+                rows.append(assignments[self.rng.integers(len(assignments), size=n)])
+            else:
+                rows = [_sample_row(missing, masks, self.rng)[None] for _ in range(n)]
+            genomes[:, i, free] = np.concatenate(rows)[:n]
+        return genomes.reshape(n, side * side)
+
+    def count_digits(self, positions):
+        """ Counts the digits of the individuals in the given positions from their values, and makes them keep the
+        counts in the population counts buffer """
+        positions = list(positions)
+        if positions:
+            self.counts[positions] = digit_counts(self.genomes[positions])
+        for k in positions:
+            self.individuals[k].counts = self.counts[k]
         return
 
-    def evolve(self, gens, select, crossover, mutate, co_p, mu_p, elitism=-1):
-        # We will create a list where we will save the fitness of the best individual of each generation, in order
-        # to help us to understand if we are stopped in a solution and not improving the fitness
-        best_fitness = []
-        # This value will increase every time that the fitness doesn't improve
-        stopped_fitness = 0
+    def store(self, individuals):
+        """ Copies the values, the fitness and the digit counts of the individuals into a new genome buffer, fitness
+        vector and counts buffer, and makes the individuals of the population views into the rows of those arrays """
+        self.genomes = np.stack([individual._genome for individual in individuals])
+        self.fitnesses = np.array([individual._fitness[0] for individual in individuals])
+        self.selection_tables = {}
+        self.counts = np.zeros((len(individuals),) + self.counts.shape[1:], dtype=self.counts.dtype)
+        # We create new views for every row, so that if the same individual appears twice in the list, the two copies
+        # are independent in the population
+        self.individuals = [Individual(self.genomes[k], self.fitnesses[k:k + 1], self.counts[k])
+                            for k in range(len(individuals))]
+        # The individuals that were keeping their digit counts bring them along, and the others (for example, the
+        # offspring of a crossover) are counted from scratch
+        missing = []
+        for k, individual in enumerate(individuals):
+            self.individuals[k].dirty = individual.dirty
+            if individual.counts is None:
+                missing.append(k)
+            else:
+                self.counts[k] = individual.counts
+        self.count_digits(missing)
+        return
+
+    def evolve(self, gens, select, crossover, mutate, co_p, mu_p, elitism=-1, stop=None, local_search=None,
+               local_k=0.1, checkpoint=None, resume=False, restart=None, duplicates=None, stagnation=None):
+        # The stop argument can be an object with an is_set method (like a threading or multiprocessing Event). If it
+        # is set by someone else (for example, another island that found a solution), we stop evolving
+        # The local_search argument can be a function with the same arguments as the mutation functions (for example,
+        # the ones in charles.local_search). If it is given, at the end of each generation it is applied to the best
+        # individuals (local_k of them, with the same meaning as the elitism argument, see elite_count)
+        # The checkpoint argument can be a Checkpointer (see charles.checkpoint), that saves the state of the population
+        # at the end of the generations. With resume=True, we continue from the state of evolve that the population
+        # has (for example, restored from a checkpoint), instead of starting again from the generation 0
+        # The restart argument can be a RestartPolicy (see charles.restarts). If it is given, when the population gets
+        # stuck it is restarted in place by the policy, instead of giving up (until the limit of the policy). If the
+        # policy has a collapse threshold, the population is also restarted when its diversity falls below it
+        # The duplicates argument says what happens to the offspring that are equal to another offspring (for example,
+        # 2 copies of a parent that wasn't crossed): None (nothing), "reject" (they are replaced by new random
+        # individuals) or "reuse" (they are not evaluated, and get the fitness of the first copy)
+        # The stagnation argument is the number of generations without improving the best fitness after which the
+        # population is stuck. By default, it is 10% of gens (when evolve is called many times towards a bigger number
+        # of generations, like the islands do, it should be given)
+        if stagnation is None:
+            stagnation = int(0.1*gens)
+        if duplicates not in (None, "reject", "reuse"):
+            raise Exception("The duplicates argument must be None, 'reject' or 'reuse'.")
+        if not resume:
+            # We will create a list where we will save the fitness of the best individual of each generation, in order
+            # to help us to understand if we are stopped in a solution and not improving the fitness
+            self.history = []
+            # This value will increase every time that the fitness doesn't improve
+            self.stopped_fitness = 0
+            self.generation = 0
+            self.restarts = 0
+            self.mutation_p = None
+        best_fitness = self.history
+        # The mutation probability of the next generations. When we resume, it is the one that the population had
+        # (that a restart policy may have raised)
+        if self.mutation_p is None:
+            self.mutation_p = mu_p
         # This value will become 1 if we found a solution
         solution_found = 0
+        start = perf_counter()
         # We will run for N generations
-        for gen in range(gens):
+        for gen in range(self.generation, gens):
+            if stop is not None and stop.is_set():
+                break
+            self.profile.start_generation()
             # In each generation, we are going to create a new population
             new_pop = []
-            # If we say that elitism == 1, we are saying that we want the standard elitism
-            if elitism == 1:
-                if self.optim == "max":
-                    elite = deepcopy(max(self.individuals, key=attrgetter("fitness")))
-                elif self.optim == "min":
-                    elite = deepcopy(min(self.individuals, key=attrgetter("fitness")))
-            # If we say that 0 < elitism < 1, we are going to perform elitism with percentages. So, for example, if
-            # we say that elitism == 0.1, we are going to delete the worse 10% of the new population, and we are going
-            # to insert the top 10% of individuals
-            elif 0 < elitism < 1:
-                if self.optim == "max":
-                    elite = deepcopy(heapq.nlargest(round(elitism*self.size), self.individuals,
-                                                    key=attrgetter("fitness")))
-                elif self.optim == "min":
-                    elite = deepcopy(heapq.nsmallest(round(elitism*self.size), self.individuals,
-                                                     key=attrgetter("fitness")))
-            # If we say that 1 < elitism < self.size, we are going to perform elitism with N individuals. So, for
-            # example, if we say that elitism == 3, we are going to delete the worse 3 individuals of the new
-            # population, and we are going to insert the top 3 of individuals
-            elif 1 < elitism < self.size:
-                if self.optim == "max":
-                    elite = deepcopy(heapq.nlargest(round(elitism), self.individuals, key=attrgetter("fitness")))
-                elif self.optim == "min":
-                    elite = deepcopy(heapq.nsmallest(round(elitism), self.individuals, key=attrgetter("fitness")))
-            # If we don't specify the elitism when calling the evolve function, or if we insert a number <= 0, or a
-            # number that is bigger than the number of individuals in the population, elitism is not going to be
-            # performed
-
-            # We are going to see if we perform crossover and mutation operations, until we have a new population with
-            # the same size as the original population
-            while len(new_pop) < self.size:
-                # With the specified selection algorithm, we are going to select 2 individuals as parents
-                parent1, parent2 = select(self), select(self)
-                # We are going to generate a random number between 0 and 1. If the number is smaller than the
-                # crossover probability that we specified when calling the evolve function, we are going to perform
-                # the selected crossover method
-                if random() < co_p:
-                    offspring1, offspring2 = crossover(parent1, parent2)
-                # Otherwise, we are not going to perform any type of crossover, and we are just going to say that the
-                # 2 offsprings are the same as the 2 parents chosen
-                else:
-                    offspring1, offspring2 = parent1, parent2
-                # We are going to generate a random number between 0 and 1. If the number is smaller than the
-                # mutation probability that we specified when calling the evolve function, we are going to perform
-                # the selected mutation method to the 1st offspring
-                if random() < mu_p:
-                    offspring1 = mutate(offspring1)
-                # We are going to do the same a 2nd time, to see if we also apply mutation to the 2nd offspring
-                if random() < mu_p:
-                    offspring2 = mutate(offspring2)
-
-                # After all of that, we are going to append the offspring1 to the new population
-                new_pop.append(offspring1)
-                # If we still have space in the new population, we are also going to insert the 2nd offspring in the
-                # new population
-                if len(new_pop) < self.size:
-                    new_pop.append(offspring2)
+            # Before creating the new population, we save a copy of the rows (values, fitness and digit counts) of the
+            # best individuals, that are going to replace the worst individuals of the new population (see
+            # elite_count for the types of elitism)
+            with self.profile.phase("elitism"):
+                elites = self.take_elites(self.elite_count(elitism))
+
+            # With the specified selection algorithm, we are going to select all the parents of the generation at once
+            # (2 for each pair of offspring), so that the selection tables are only built once
+            pairs = (self.size + 1) // 2
+            with self.profile.phase("selection"):
+                parents = select(self, 2 * pairs)
+            # For each pair of parents, we are going to generate a random number between 0 and 1. If the number is
+            # smaller than the crossover probability that we specified when calling the evolve function, we are going
+            # to perform the selected crossover method on that pair (all the pairs at once, if the crossover has a
+            # batch version)
+            with self.profile.phase("crossover"):
+                offspring = self.crossover_pairs(parents, np.flatnonzero(self.rng.random(pairs) < co_p).tolist(),
+                                                 crossover)
+            with self.profile.phase("mutation"):
+                # In the same way, we draw the random numbers that decide if we perform mutation on each offspring
+                mutations = self.rng.random((pairs, 2)) < self.mutation_p
+                # We are going to see if we perform mutation operations, until we have a new population with the same
+                # size as the original population
+                for pair in range(pairs):
+                    # We are going to take the next 2 individuals that were selected as parents
+                    parent1, parent2 = parents[2 * pair], parents[2 * pair + 1]
+                    if pair in offspring:
+                        offspring1, offspring2 = offspring[pair]
+                    # Otherwise, we did not perform any type of crossover, and we are just going to say that the 2
+                    # offsprings are the same as the 2 parents chosen. They are copy-on-write copies of the parents (see
+                    # Individual.share), so the mutation never changes a parent (that can be selected more than once)
+                    else:
+                        offspring1, offspring2 = parent1.share(), parent2.share()
+                    # We are going to generate a random number between 0 and 1. If the number is smaller than the
+                    # mutation probability that we specified when calling the evolve function, we are going to perform
+                    # the selected mutation method to the 1st offspring
+                    if mutations[pair, 0]:
+                        offspring1 = mutate(offspring1, self.context, self.rng)
+                    # We are going to do the same a 2nd time, to see if we also apply mutation to the 2nd offspring
+                    if mutations[pair, 1]:
+                        offspring2 = mutate(offspring2, self.context, self.rng)
+
+                    # After all of that, we are going to append the offspring1 to the new population
+                    new_pop.append(offspring1)
+                    # If we still have space in the new population, we are also going to insert the 2nd offspring in
+                    # the new population
+                    if len(new_pop) < self.size:
+                        new_pop.append(offspring2)
 
             # After having all the individuals from the new population created, we are going to say that
             # the individuals from the population of that generation are the ones in the new_pop, and we are going
             # to calculate their fitness
-            self.individuals = new_pop
-            self.calculate_fitness()
-            # After that, we are going to get the individuals that are going to be deleted from the new population, in
-            # the case that we are working with any type of elitism
-
-            # If we are performing the standard elitism, we need to get the individual with the worst fitness
-            if elitism == 1:
-                # If we have a maximization problem, the selected will be the individual with the lowest fitness
-                if self.optim == "max":
-                    least = min(new_pop, key=attrgetter("fitness"))
-                # If we have a minimization problem, the selected will be the individual with the highest fitness
-                elif self.optim == "min":
-                    least = max(new_pop, key=attrgetter("fitness"))
-                # We need to remove from the new population the selected individual
-                new_pop.pop(new_pop.index(least))
-                # And then, we need to append to the new population the individual that was selected as the elite
-                new_pop.append(elite)
-            # If we are performing elitism with percentages, we need to get the X% individuals with the worst fitness
-            elif 0 < elitism < 1:
-                # If we have a maximization problem, the selected will be the individuals with the lowest fitness
-                if self.optim == "max":
-                    least = heapq.nsmallest(round(elitism*self.size), self.individuals, key=attrgetter("fitness"))
-                # If we have a minimization problem, the selected will be the individuals with the highest fitness
-                elif self.optim == "min":
-                    least = heapq.nlargest(round(elitism*self.size), self.individuals, key=attrgetter("fitness"))
-                # We need to remove from the new population the selected individuals
-                for least_element in least:
-                    new_pop.pop(new_pop.index(least_element))
-                # And then, we need to append to the new population the individuals that were selected as the elite
-                for elite_element in elite:
-                    new_pop.append(elite_element)
-            # If we are performing elitism with N > 1, we need to get the N individuals with the lowest fitness
-            elif 1 < elitism < self.size:
-                # If we have a maximization problem, the selected will be the individuals with the lowest fitness
-                if self.optim == "max":
-                    least = heapq.nsmallest(round(elitism), self.individuals, key=attrgetter("fitness"))
-                # If we have a minimization problem, the selected will be the individuals with the highest fitness
-                elif self.optim == "min":
-                    least = heapq.nlargest(round(elitism), self.individuals, key=attrgetter("fitness"))
-                # We need to remove from the new population the selected individuals
-                for least_element in least:
-                    new_pop.pop(new_pop.index(least_element))
-                # And then, we need to append to the new population the individuals that were selected as the elite
-                for elite_element in elite:
-                    new_pop.append(elite_element)
-
-            # Then, at the end of each generation, we are just going to print the best individual of the generation
-            if self.optim == "max":
-                print(f'Best Individual: {max(self, key=attrgetter("fitness"))}')
-                best_individual = max(self, key=attrgetter("fitness"))
-            elif self.optim == "min":
-                print(f'Best Individual: {min(self, key=attrgetter("fitness"))}')
-                best_individual = min(self, key=attrgetter("fitness"))
+            with self.profile.phase("fitness"):
+                self.store(new_pop)
+                # Before evaluating the new population, we deal with its duplicates
+                rejected = self.reject_duplicates() if duplicates == "reject" else 0
+                pending = sum(individual.dirty for individual in self.individuals)
+                evaluated = self.calculate_fitness(reuse_duplicates=duplicates == "reuse")
+                self.evaluations_saved.append(len(new_pop) - evaluated)
+                self.duplicates_rejected.append(rejected)
+                self.duplicates_reused.append(pending - evaluated)
+            # After that, we are going to replace the worst individuals of the new population by the elites
+            with self.profile.phase("elitism"):
+                self.insert_elites(elites)
+            # If we are doing local search, we improve the best individuals of the new population, and evaluate the
+            # ones that changed
+            if local_search is not None:
+                with self.profile.phase("local_search"):
+                    for k in self.best_positions(self.elite_count(local_k)):
+                        local_search(self.individuals[k], self.context, self.rng)
+                    evaluated += self.calculate_fitness()
+
+            # Then, at the end of each generation, we are going to get the best individual of the generation, and tell
+            # the observers about it
+            with self.profile.phase("reporting"):
+                best_individual = self.individuals[self.best_positions(1)[0]]
+                # The diversity is only measured if someone is going to use it
+                diversity = None
+                if self.observers or (restart is not None and restart.collapse is not None):
+                    diversity = self.diversity()
+                stats = None
+                if self.observers:
+                    stats = GenerationStats(gen, best_individual.fitness, float(self.fitnesses.mean()), evaluated,
+                                            self.evaluations_saved[-1], perf_counter() - start, *diversity,
+                                            self.duplicates_rejected[-1], self.duplicates_reused[-1])
+                    for observer in self.observers:
+                        observer.on_generation(self, stats)
 
             # If we found a solution, the program will stop
             if best_individual.fitness == 1:
-                print("Solution found!")
                 solution_found = 1
                 best_fitness.append(best_individual.fitness)
+                self.generation = gen + 1
+                for observer in self.observers:
+                    observer.on_solution(self, stats, best_individual)
                 break
 
+            # If the best individual is better than all the previous generations, we are not stuck anymore (and we go
+            # back to the original mutation probability). Otherwise, we are going to increment 1 to the variable
+            # stopped_fitness
+            if best_fitness and not (max(best_fitness) < best_individual.fitness if self.optim == "max"
+                                     else min(best_fitness) > best_individual.fitness):
+                self.stopped_fitness += 1
+            else:
+                self.stopped_fitness = 0
+                self.mutation_p = mu_p
+
             # At the end of every generation, we are going to save the fitness of the best individual
             best_fitness.append(best_individual.fitness)
 
-            # If we see that we didn't improve the fitness from the last generation, we are going to increment 1 to the
-            # variable stopped_fitness
-            if gen != 0 and best_fitness[gen] == best_fitness[gen-1]:
-                stopped_fitness += 1
+            self.generation = gen + 1
+
+            # If we were stuck for stagnation generations (or the population collapsed), we are going to restart the
+            # population. With a restart policy, the population is restarted here and we keep evolving it, and
+            # otherwise we give up (and whoever called evolve can start a new population)
+            give_up = False
+            collapsed = restart is not None and restart.collapse is not None and diversity.hamming < restart.collapse
+            if self.stopped_fitness >= stagnation or collapsed:
+                for observer in self.observers:
+                    observer.on_restart(self, stats)
+                if restart is None or (restart.limit is not None and self.restarts >= restart.limit):
+                    give_up = True
+                else:
+                    with self.profile.phase("restart"):
+                        self.mutation_p = restart.restart(self, self.mutation_p)
+                    self.restarts += 1
+                    self.stopped_fitness = 0
 
-            # If we were stuck 100 times, we are going to restart the population
-            if stopped_fitness >= int(0.1*gens):
-                print("The solutions got stuck... Re-starting the population...")
+            # The generation is complete (including the restart), so this is where we save the checkpoints. A run that
+            # is resumed from them continues with the next generation, as if it had never stopped
+            if checkpoint is not None:
+                with self.profile.phase("checkpoint"):
+                    checkpoint.update(self)
+            if give_up:
                 break
 
+        # If the population is being profiled, the profiler stops tracing the memory until the next run (its report is
+        # read with self.profile.report(), so evolve always returns the same values, with or without a profiler)
+        self.profile.close()
         return solution_found, best_fitness
 
+    def crossover_pairs(self, parents, pairs, crossover):
+        """ Performs the crossover on the given pairs of parents (the pair k is made of parents[2k] and parents[2k+1]).
+        If the crossover function has a batch version (crossover.batch), all the pairs are crossed in one call.
+
+            Returns:
+                dict: the 2 offspring of each one of the pairs.
+        """
+        batch = getattr(crossover, "batch", None)
+        if batch is None or not pairs:
+            return {pair: crossover(parents[2 * pair], parents[2 * pair + 1], self.context, self.rng) for pair in pairs}
+
+        # np.stack already copies the values of the parents, so the batch writes the crossed rows over these copies
+        # (copy=False) instead of copying them again
+        offspring1, offspring2 = batch(np.stack([parents[2 * pair].values for pair in pairs]),
+                                       np.stack([parents[2 * pair + 1].values for pair in pairs]), self.context,
+                                       self.rng, copy=False)
+        # The offspring are views into the rows of the arrays that the batch returned (they are copied into the genome
+        # buffer of the population when it is stored)
+        offspring1 = offspring1.reshape(len(pairs), -1)
+        offspring2 = offspring2.reshape(len(pairs), -1)
+        return {pair: (Individual(offspring1[k]), Individual(offspring2[k])) for k, pair in enumerate(pairs)}
+
+    def elite_count(self, elitism):
+        """ Returns the number of elites for the elitism argument of evolve:
+            - If elitism == 1, we want the standard elitism (1 elite);
+            - If 0 < elitism < 1, we perform elitism with percentages. So, for example, if elitism == 0.1, we are going
+              to delete the worse 10% of the new population, and we are going to insert the top 10% of individuals;
+            - If 1 < elitism < self.size, we perform elitism with N individuals. So, for example, if elitism == 3, we
+              are going to delete the worse 3 individuals of the new population, and we are going to insert the top 3;
+            - Otherwise (if we don't specify the elitism, or if it is <= 0, or bigger than the number of individuals in
+              the population), elitism is not performed.
+        """
+        if elitism == 1:
+            return 1
+        elif 0 < elitism < 1:
+            return round(elitism * self.size)
+        elif 1 < elitism < self.size:
+            return round(elitism)
+        return 0
+
+    def take_elites(self, k):
+        """ Returns a copy of the genomes, fitness and digit counts of the k best individuals (only the rows of the
+        arrays are copied) """
+        positions = self.best_positions(k)
+        return self.genomes[positions], self.fitnesses[positions], self.counts[positions]
+
+    def insert_elites(self, elites):
+        """ Replaces the worst individuals of the population by the elites (as returned by take_elites), copying their
+        rows into the rows of the replaced individuals """
+        genomes, fitnesses, counts = elites
+        if len(genomes) == 0:
+            return
+        positions = self.worst_positions(len(genomes))
+        self.genomes[positions] = genomes
+        self.fitnesses[positions] = fitnesses
+        self.counts[positions] = counts
+        # The elites already have their fitness
+        for k in positions:
+            self.individuals[k].dirty = False
+        # The fitness of some individuals changed, so the selection tables need to be built again
+        self.selection_tables = {}
+        return
+
+    def best_positions(self, k):
+        """ Returns the positions of the k best individuals in the population (in no particular order) """
+        return _extreme_positions(self.fitnesses, k, largest=self.optim == "max")
+
+    def worst_positions(self, k):
+        """ Returns the positions of the k worst individuals in the population (in no particular order) """
+        return _extreme_positions(self.fitnesses, k, largest=self.optim != "max")
+
+    def best_genomes(self, k):
+        """ Returns a copy of the genomes of the k best individuals, as a (k, side * side) array """
+        return self.genomes[self.best_positions(k)].copy()
+
+    def replace_worst(self, genomes):
+        """ Replaces the worst individuals of the population by the given (k, side * side) genomes (for example,
+        migrants that came from another population), and evaluates them """
+        genomes = np.asarray(genomes, dtype=self.genomes.dtype).reshape(len(genomes), -1)
+        positions = self.worst_positions(len(genomes))
+        self.genomes[positions] = genomes
+        for k in positions:
+            self.individuals[k].dirty = True
+        self.count_digits(positions)
+        self.calculate_fitness()
+        return
+
+    def reseed(self, n):
+        """ Replaces the n worst individuals of the population by new random individuals (sampled with the candidates
+        of the puzzle, as in the initialization, see sample_genomes), and evaluates them """
+        if n > 0:
+            self.replace_worst(self.sample_genomes(n))
+        return
+
+    def diversity(self):
+        """ Returns the diversity of the population (see charles.diversity) """
+        return genome_diversity(self.genomes, self.context)
+
     def __len__(self):
         return len(self.individuals)
 
@@ -409,3 +1130,84 @@ class Population(object):
             return sorted(self.individuals, key=lambda x: x.fitness)
         elif self.optim == "min":
             return sorted(self.individuals, key=lambda x: x.fitness, reverse=True)
+
+
+def _extreme_positions(values, k, largest):
+    """ Returns the positions of the k largest (or smallest) values, with a partial sort (argpartition) """
+    n = len(values)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if largest:
+        return np.argpartition(values, n - k)[n - k:]
+    return np.argpartition(values, k - 1)[:k]
+
+
+def _row_assignments(missing, masks, limit=2 ** 16):
+    """ Returns all the assignments of the missing digits of a row to its free cells (with the candidate masks of the
+    cells) in which each cell gets one of its candidates, as an (M, cells) array. If the row has more than limit of
+    them, or if the search takes too many steps, it returns None. """
+
+    masks = [int(mask) for mask in masks]
+    # The cells with fewer candidates are filled first, so that the dead ends are found earlier
+    order = sorted(range(len(masks)), key=lambda cell: masks[cell].bit_count())
+    row = [0] * len(masks)
+    found = []
+    steps = 0
+
+    def fill(k, left):
+        # Returns False if the search has to stop (too many assignments, or too many steps)
+        nonlocal steps
+        if k == len(order):
+            found.append(tuple(row))
+            return len(found) <= limit
+        steps += 1
+        if steps > 16 * limit:
+            return False
+        cell = order[k]
+        options = masks[cell] & left
+        while options:
+            bit = options & -options
+            row[cell] = bit.bit_length()
+            if not fill(k + 1, left ^ bit):
+                return False
+            options ^= bit
+        return True
+
+    left = 0
+    for digit in missing:
+        left |= 1 << (int(digit) - 1)
+    if not fill(0, left):
+        return None
+    return np.array(found, dtype=missing.dtype).reshape(len(found), len(masks))
+
+
+def _sample_row(missing, masks, rng):
+    """ Returns a random assignment of the missing digits of a row to its free cells (with the candidate masks of the
+    cells), in which each cell gets one of its candidates. The cells are filled from the one with fewer options, trying
+    its options in a random order and going back when a cell runs out of options. If there is no such assignment, it
+    returns a random permutation of the missing digits. """
+
+    masks = [int(mask) for mask in masks]
+    row = [0] * len(masks)
+    # The random order in which each cell tries its options (drawn at once for the whole row)
+    order = rng.random((len(masks), int(max(missing)))).tolist()
+
+    def fill(cells, left):
+        # The options of a cell are its candidates that are still left (as a mask)
+        if not cells:
+            return True
+        cell = min(cells, key=lambda cell: (masks[cell] & left).bit_count())
+        rest = [other for other in cells if other != cell]
+        for digit in sorted(mask_digits(masks[cell] & left), key=lambda digit: order[cell][digit - 1]):
+            row[cell] = digit
+            if fill(rest, left ^ (1 << (digit - 1))):
+                return True
+        return False
+
+    left = 0
+    for digit in missing:
+        left |= 1 << (int(digit) - 1)
+    if fill(list(range(len(masks))), left):
+        return np.array(row)
+    return rng.permutation(missing)
@@ -0,0 +1,139 @@
+import json
+import os
+from time import perf_counter
+
+import numpy as np
+
+# A checkpoint file starts with this magic string and the length of a JSON header (8 bytes, little endian), followed by
+# the header and by the raw arrays. The header has the scalar state of the population and the dtype, shape and offset
+# of each array. The arrays are aligned, so that they can be memory-mapped directly
+MAGIC = b"GACKPT01"
+ALIGNMENT = 64
+
+
+def save_checkpoint(population, path):
+    """
+    Saves the state of a population (its genomes, fitness, RNG state, generation counter, stopped_fitness, restarts,
+    mutation probability, and the fitness history of evolve) to a binary file. The file is written next to the
+    destination and then moved over it, so a process that is killed in the middle of a save never leaves a broken
+    checkpoint behind.
+
+    Args:
+        population (Population): The population to save.
+        path (str): Path of the checkpoint file.
+    """
+
+    arrays = {
+        "genomes": np.ascontiguousarray(population.genomes),
+        "fitnesses": np.ascontiguousarray(population.fitnesses),
+        "history": np.asarray(population.history, dtype=np.float64),
+    }
+    offset = 0
+    layout = {}
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += _aligned(array.nbytes)
+    header = json.dumps({
+        "size": population.size,
+        "optim": population.optim,
+        "generation": population.generation,
+        "stopped_fitness": population.stopped_fitness,
+        "evaluations": population.evaluations,
+        "restarts": population.restarts,
+        "mutation_p": population.mutation_p,
+        "rng_state": population.rng.bit_generator.state,
+        "arrays": layout,
+    }).encode()
+    # The arrays start after the magic string, the length of the header and the header (padded with spaces)
+    header += b" " * (_aligned(len(MAGIC) + 8 + len(header)) - len(MAGIC) - 8 - len(header))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        file.write(len(header).to_bytes(8, "little"))
+        file.write(header)
+        for array in arrays.values():
+            file.write(array.data)
+            file.write(b"\0" * (_aligned(array.nbytes) - array.nbytes))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return
+
+
+def load_checkpoint(path):
+    """
+    Loads a checkpoint saved by save_checkpoint. Only the header is parsed: the arrays are memory-mapped copy-on-write,
+    so they are read from the disk as they are used, and changing them doesn't change the file.
+
+    Args:
+        path (str): Path of the checkpoint file.
+
+    Returns:
+        dict: The scalar state of the population (size, optim, generation, stopped_fitness, restarts, mutation_p,
+        evaluations and rng_state), and its genomes, fitnesses and history arrays.
+    """
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise Exception(f"{path} is not a checkpoint file.")
+        length = int.from_bytes(file.read(8), "little")
+        state = json.loads(file.read(length))
+    start = len(MAGIC) + 8 + length
+
+    for name, array in state.pop("arrays").items():
+        dtype, shape = np.dtype(array["dtype"]), tuple(array["shape"])
+        # An empty array can't be memory-mapped (for example, the history before the first generation)
+        if np.prod(shape) == 0:
+            state[name] = np.empty(shape, dtype=dtype)
+        else:
+            state[name] = np.memmap(path, dtype=dtype, mode="c", offset=start + array["offset"], shape=shape)
+    return state
+
+
+def restore_rng(rng_state):
+    """ Returns a new NumPy Generator with the given state (as saved in a checkpoint) """
+    rng = np.random.Generator(getattr(np.random, rng_state["bit_generator"])())
+    rng.bit_generator.state = rng_state
+    return rng
+
+
+class Checkpointer(object):
+    """ Saves a checkpoint of the population that it is given to Population.evolve, at the end of the generations,
+    every every_gens generations or every every_seconds seconds (whichever comes first). If neither is given, it saves
+    at the end of every generation. """
+
+    def __init__(self, path, every_gens=None, every_seconds=None):
+        self.path = path
+        self.every_gens = every_gens
+        self.every_seconds = every_seconds
+        self.saved_generation = None
+        self.saved_time = perf_counter()
+
+    def update(self, population):
+        """ Called by evolve at the end of each generation. Returns if it saved a checkpoint """
+        # The intervals start in the first call (the checkpointer may have been created in another process)
+        if self.saved_generation is None:
+            self.saved_generation = population.generation - 1
+            self.saved_time = perf_counter()
+        due = self.every_gens is None and self.every_seconds is None
+        if self.every_gens is not None and population.generation - self.saved_generation >= self.every_gens:
+            due = True
+        if self.every_seconds is not None and perf_counter() - self.saved_time >= self.every_seconds:
+            due = True
+        if due:
+            self.save(population)
+        return due
+
+    def save(self, population):
+        save_checkpoint(population, self.path)
+        self.saved_generation = population.generation
+        self.saved_time = perf_counter()
+        return
+
+    def __repr__(self):
+        return f"Checkpointer(path={self.path!r}, every_gens={self.every_gens}, every_seconds={self.every_seconds})"
+
+
+def _aligned(nbytes):
+    return -(-nbytes // ALIGNMENT) * ALIGNMENT
@@ -1,39 +1,36 @@
-from random import randint, sample
 import numpy as np
-from charles.charles_file import Individual
 
 
-def cycle_co(p1, p2):
+def cycle_co(p1, p2, context, rng):
     """
     Implementation of cycle crossover.
 
     Args:
         p1 (Individual): First parent for crossover.
         p2 (Individual): Second parent for crossover.
+        context (PuzzleContext): The context of the puzzle that is being solved.
+        rng (np.random.Generator): The random number generator of the run.
 
     Returns:
         Individuals: Two offspring, resulting from the crossover.
     """
 
-    # We start by creating the 2 offsprings, that are Individuals
-    offspring1 = Individual()
-    offspring2 = Individual()
-
-    # The values from the 1st offspring are the same as the values from the 1st parent (and the same applies to the 2nd
-    # offspring)
-    offspring1.values = np.copy(p1.values)
-    offspring2.values = np.copy(p2.values)
+    # We start by creating the 2 offsprings. The values from the 1st offspring are the same as the values from the 1st
+    # parent (and the same applies to the 2nd offspring). The offspring share the values of the parents until one of
+    # their rows changes (see Individual.share), so the parents are never changed
+    offspring1 = p1.share(counts=False)
+    offspring2 = p2.share(counts=False)
 
     # Then, we get 2 crossover points. We are going to perform the crossover from the row with index = crossover_point1,
     # until the row with index = crossover_point2
-    crossover_point1 = randint(0, 8)
-    crossover_point2 = randint(1, 9)
+    crossover_point1 = rng.integers(0, context.side)
+    crossover_point2 = rng.integers(1, context.side + 1)
 
     # We don't want to have the same crossover points, since that would mean that we would be performing crossover
     # between just 1 row of the puzzle
     while crossover_point1 == crossover_point2:
-        crossover_point1 = randint(0, 8)
-        crossover_point2 = randint(1, 9)
+        crossover_point1 = rng.integers(0, context.side)
+        crossover_point2 = rng.integers(1, context.side + 1)
 
     # If the first value is bigger than the 2nd, we just flip it, making the 1st = the 2nd, and the 2nd = the 1st
     if crossover_point1 > crossover_point2:
@@ -43,8 +40,12 @@ def cycle_co(p1, p2):
 
     # Then, we go perform the crossover operation between rows with index = crossover_point1, until rows with
     # index = crossover_point2
+    # (the rows with less than 2 cells that weren't given are the same in both parents, so we skip them)
     for i in range(crossover_point1, crossover_point2):
-        offspring1.values[i], offspring2.values[i] = crossover_rows(offspring1.values[i], offspring2.values[i])
+        if len(context.free_columns[i]) > 1:
+            row1, row2 = crossover_rows(offspring1.values[i], offspring2.values[i])
+            offspring1.set_row(i, row1)
+            offspring2.set_row(i, row2)
 
     # After performing all the operations, we return the 2 offsprings
     return offspring1, offspring2
@@ -56,14 +57,15 @@ def crossover_rows(row1, row2):
     At the end of all the operations, the function returns the new rows with index i for both offspring 1 and 2.
     """
 
-    # We start the operation by creating 2 numpy arrays of 9 0's. The offspring_row1 is going to be the row with
-    # index i in the 1st offspring; the offspring_row2 is going to be the row with index i in the 2nd offspring
-    offspring_row1 = np.zeros(9, dtype=int)
-    offspring_row2 = np.zeros(9, dtype=int)
+    # We start the operation by creating 2 numpy arrays of 9 0's (one for each cell of the row). The offspring_row1 is
+    # going to be the row with index i in the 1st offspring; the offspring_row2 is going to be the row with index i in
+    # the 2nd offspring
+    offspring_row1 = np.zeros(len(row1), dtype=int)
+    offspring_row2 = np.zeros(len(row1), dtype=int)
 
     # We then create a list from 1 to 9 (all the values that a Sudoku row needs to have). Later, we are going to remove
     # from this list the values that were already used, in order to don't have repeated numbers in the rows.
-    remaining = list(range(1, 10))
+    remaining = list(range(1, len(row1) + 1))
 
     cycle = 0
 
@@ -176,37 +178,36 @@ def find_value(parent_row, value):
             return i
 
 
-def pmx_co(p1, p2):
+def pmx_co(p1, p2, context, rng):
     """
     Implementation of partially matched/mapped crossover.
 
     Args:
         p1 (Individual): First parent for crossover.
         p2 (Individual): Second parent for crossover.
+        context (PuzzleContext): The context of the puzzle that is being solved.
+        rng (np.random.Generator): The random number generator of the run.
 
     Returns:
         Individuals: Two offspring, resulting from the crossover.
     """
 
-    # We start by creating the 2 offsprings, that are Individuals
-    offspring1 = Individual()
-    offspring2 = Individual()
-
-    # The values from the 1st offspring are the same as the values from the 1st parent (and the same applies to the 2nd
-    # offspring)
-    offspring1.values = np.copy(p1.values)
-    offspring2.values = np.copy(p2.values)
+    # We start by creating the 2 offsprings. The values from the 1st offspring are the same as the values from the 1st
+    # parent (and the same applies to the 2nd offspring). The offspring share the values of the parents until one of
+    # their rows changes (see Individual.share), so the parents are never changed
+    offspring1 = p1.share(counts=False)
+    offspring2 = p2.share(counts=False)
 
     # Then, we get 2 crossover points. We are going to perform the crossover from the row with index = crossover_point1,
     # until the row with index = crossover_point2
-    crossover_point1 = randint(0, 8)
-    crossover_point2 = randint(1, 9)
+    crossover_point1 = rng.integers(0, context.side)
+    crossover_point2 = rng.integers(1, context.side + 1)
 
     # We don't want to have the same crossover points, since that would mean that we would be performing crossover
     # between just 1 row of the puzzle
     while crossover_point1 == crossover_point2:
-        crossover_point1 = randint(0, 8)
-        crossover_point2 = randint(1, 9)
+        crossover_point1 = rng.integers(0, context.side)
+        crossover_point2 = rng.integers(1, context.side + 1)
 
     # If the first value is bigger than the 2nd, we just flip it, making the 1st = the 2nd, and the 2nd = the 1st
     if crossover_point1 > crossover_point2:
@@ -216,14 +217,18 @@ def pmx_co(p1, p2):
 
     # Then, we go perform the crossover operation between rows with index = crossover_point1, until rows with
     # index = crossover_point2
+    # (the rows with less than 2 cells that weren't given are the same in both parents, so we skip them)
     for i in range(crossover_point1, crossover_point2):
-        offspring1.values[i], offspring2.values[i] = pmx_crossover_rows(offspring1.values[i], offspring2.values[i])
+        if len(context.free_columns[i]) > 1:
+            row1, row2 = pmx_crossover_rows(offspring1.values[i], offspring2.values[i], rng)
+            offspring1.set_row(i, row1)
+            offspring2.set_row(i, row2)
 
     # After performing all the operations, we return the 2 offsprings
     return offspring1, offspring2
 
 
-def pmx_crossover_rows(row1, row2):
+def pmx_crossover_rows(row1, row2, rng):
     """
     This function receives 2 rows (the rows with index i from the 2 parents), and performs partially matched/mapped
     crossover between them. At the end of all the operations, the function returns the new rows with index i for both
@@ -231,7 +236,7 @@ def pmx_crossover_rows(row1, row2):
     """
 
     # We will start by choosing randomly 2 points, to get the window
-    co_points = sample(range(len(row1)), 2)
+    co_points = rng.choice(len(row1), 2, replace=False)
     # Then, we sort those points, from the lowest to the biggest, to get the window for the crossover
     co_points.sort()
 
@@ -260,15 +265,15 @@ def pmx_crossover_rows(row1, row2):
             index = np.where(y == x[np.where(y == temp)])
             # Then, we will check in the offspring if in that same index we already have a value. We perform this check
             # until we find a position that is empty.
-            while o[int(index[0])] is not None:
+            while o[int(index[0][0])] is not None:
                 # The temporary value is going to be the index that we have saved
-                temp = int(index[0])
+                temp = int(index[0][0])
                 # We will find where in the row of the 2nd parent is stored the value that we have in the position
                 # that we have saved in the row of the 1st parent
                 index = np.where(y == x[temp])
             # When we finally find a position in the offspring that is empty, we assign to that position the I'th value
             # that is in the window and that we didn't use until now.
-            o[int(index[0])] = i
+            o[int(index[0][0])] = i
 
         # After using all the values in the window, but if we still don't have a full offspring, we are going to copy
         # to each empty position in the offspring the value that is in that position in the 2nd parent
@@ -279,3 +284,151 @@ def pmx_crossover_rows(row1, row2):
 
     o1, o2 = PMX(row1, row2), PMX(row2, row1)
     return o1, o2
+
+
+def cycle_co_batch(parents1, parents2, context, rng, copy=True):
+    """
+    Batch implementation of cycle crossover: performs the crossover for many pairs of parents at once, with the same
+    rules as cycle_co (each pair gets its own random range of rows).
+
+    Args:
+        parents1 (np.ndarray): The values of the first parent of each pair, with shape (P, side, side).
+        parents2 (np.ndarray): The values of the second parent of each pair, with shape (P, side, side).
+        context (PuzzleContext): The context of the puzzle that is being solved.
+        rng (np.random.Generator): The random number generator of the run.
+        copy (bool): If False, the offspring are written over parents1 and parents2 (only the crossed rows change),
+            instead of over copies of them.
+
+    Returns:
+        np.ndarray: Two arrays with shape (P, side, side), with the values of the 2 offspring of each pair.
+    """
+
+    offspring1, offspring2 = (np.copy(parents1), np.copy(parents2)) if copy else (parents1, parents2)
+    pairs, rows = _crossover_rows_batch(rng, len(parents1), context)
+    x, y = parents1[pairs, rows], parents2[pairs, rows]
+    offspring1[pairs, rows], offspring2[pairs, rows] = cycle_rows_batch(x, y)
+    return offspring1, offspring2
+
+
+def cycle_rows_batch(rows1, rows2):
+    """
+    Performs cycle crossover between many pairs of rows at once. Gives the same rows as crossover_rows, but instead of
+    following the cycles one value at a time, it labels all the cycles of all the rows with a few array operations.
+
+    Args:
+        rows1, rows2 (np.ndarray): Arrays with shape (R, side), where each row is a permutation of the numbers 1 to
+            side.
+
+    Returns:
+        np.ndarray: Two arrays with shape (R, side), with the rows of the 1st and of the 2nd offspring.
+    """
+
+    positions = np.broadcast_to(np.arange(rows1.shape[1]), rows1.shape)
+    # The inverse-position table of the 1st row: where_in_row1[r, v-1] is the index of the value v in rows1[r]
+    where_in_row1 = _inverse(rows1)
+    # Inside a cycle, from the index i we go to the index (in the 1st row) of the value that the 2nd row has in i
+    following = np.take_along_axis(where_in_row1, rows2.astype(np.intp) - 1, axis=1)
+    # We label each index with the smallest index of its cycle. A cycle has at most side indexes, so after side - 1
+    # steps every index has seen all the indexes of its cycle
+    label = positions.copy()
+    for _ in range(rows1.shape[1] - 1):
+        label = np.minimum(label, np.take_along_axis(label, following, axis=1))
+    # crossover_rows goes through the cycles in the order of their smallest index, so the number of a cycle is the
+    # number of cycles that start before it. The even cycles keep the values of their parent, and the odd ones flip them
+    starts = np.cumsum(label == positions, axis=1) - 1
+    flip = np.take_along_axis(starts, label, axis=1) % 2 == 1
+    return np.where(flip, rows2, rows1), np.where(flip, rows1, rows2)
+
+
+def pmx_co_batch(parents1, parents2, context, rng, copy=True):
+    """
+    Batch implementation of partially matched/mapped crossover: performs the crossover for many pairs of parents at
+    once, with the same rules as pmx_co (each pair gets its own random range of rows, and each row its own window).
+
+    Args:
+        parents1 (np.ndarray): The values of the first parent of each pair, with shape (P, side, side).
+        parents2 (np.ndarray): The values of the second parent of each pair, with shape (P, side, side).
+        context (PuzzleContext): The context of the puzzle that is being solved.
+        rng (np.random.Generator): The random number generator of the run.
+        copy (bool): If False, the offspring are written over parents1 and parents2 (only the crossed rows change),
+            instead of over copies of them.
+
+    Returns:
+        np.ndarray: Two arrays with shape (P, side, side), with the values of the 2 offspring of each pair.
+    """
+
+    offspring1, offspring2 = (np.copy(parents1), np.copy(parents2)) if copy else (parents1, parents2)
+    pairs, rows = _crossover_rows_batch(rng, len(parents1), context)
+    # Each row gets a window, between 2 different random points (like in pmx_crossover_rows)
+    start = rng.integers(0, context.side, len(rows))
+    end = rng.integers(0, context.side - 1, len(rows))
+    end += end >= start
+    start, end = np.minimum(start, end), np.maximum(start, end)
+    x, y = parents1[pairs, rows], parents2[pairs, rows]
+    offspring1[pairs, rows] = pmx_rows_batch(x, y, start, end)
+    offspring2[pairs, rows] = pmx_rows_batch(y, x, start, end)
+    return offspring1, offspring2
+
+
+def pmx_rows_batch(rows1, rows2, start, end):
+    """
+    Performs partially matched/mapped crossover between many pairs of rows at once, and returns the offspring rows that
+    get the window from rows1 (the same as the PMX function inside pmx_crossover_rows).
+
+    Args:
+        rows1, rows2 (np.ndarray): Arrays with shape (R, side), where each row is a permutation of the numbers 1 to
+            side.
+        start, end (np.ndarray): Arrays with shape (R,), with the window [start, end) of each row.
+
+    Returns:
+        np.ndarray: An array with shape (R, side), with the offspring rows.
+    """
+
+    positions = np.arange(rows1.shape[1])
+    window = (positions >= start[:, None]) & (positions < end[:, None])
+    where_in_row1 = _inverse(rows1)
+    # Outside the window, each position starts with the value of the 2nd parent. While that value is already used in
+    # the window (it is in the window of the 1st parent), we replace it by the value that the 2nd parent has in the
+    # position where the 1st parent has it. The mapping chains have at most side steps
+    values = rows2.astype(np.intp)
+    for _ in range(rows1.shape[1]):
+        index = np.take_along_axis(where_in_row1, values - 1, axis=1)
+        mapped = np.take_along_axis(window, index, axis=1) & ~window
+        if not mapped.any():
+            break
+        values = np.where(mapped, np.take_along_axis(rows2, index, axis=1), values)
+    # Inside the window, the values are copied from the 1st parent
+    return np.where(window, rows1, values).astype(rows1.dtype)
+
+
+def _inverse(rows):
+    """ For rows that are permutations of the numbers 1 to side, returns the inverse-position table: inverse[r, v-1] is
+    the index of the value v in rows[r] """
+    inverse = np.empty(rows.shape, dtype=np.intp)
+    np.put_along_axis(inverse, rows.astype(np.intp) - 1, np.broadcast_to(np.arange(rows.shape[1]), rows.shape), axis=1)
+    return inverse
+
+
+def _crossover_rows_batch(rng, pairs, context):
+    """ Draws the range of rows of each pair (like in cycle_co and pmx_co, 2 different crossover points), and returns
+    the pair and row indexes of all the rows that are going to be crossed """
+
+    point1 = rng.integers(0, context.side, pairs)
+    point2 = rng.integers(1, context.side + 1, pairs)
+    # We don't want to have the same crossover points
+    same = point1 == point2
+    while same.any():
+        point1[same] = rng.integers(0, context.side, same.sum())
+        point2[same] = rng.integers(1, context.side + 1, same.sum())
+        same = point1 == point2
+    low, high = np.minimum(point1, point2), np.maximum(point1, point2)
+    # The rows with less than 2 cells that weren't given are the same in both parents, so we skip them
+    free_rows = np.array([len(columns) > 1 for columns in context.free_columns])
+    rows = np.arange(context.side)
+    return np.nonzero((rows >= low[:, None]) & (rows < high[:, None]) & free_rows)
+
+
+# The crossover functions that have a batch version expose it, so that Population.evolve can do all the crossovers of
+# a generation in one call
+cycle_co.batch = cycle_co_batch
+pmx_co.batch = pmx_co_batch
@@ -0,0 +1,81 @@
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+# The diversity of a population: the mean Hamming distance between 2 individuals on the free cells (as a fraction of
+# the free cells, so 0 means that all the individuals are equal), the mean entropy of the values of a free cell across
+# the population (in bits), and the number of distinct genomes
+Diversity = namedtuple("Diversity", ["hamming", "entropy", "distinct"])
+
+
+def genome_diversity(genomes, context):
+    """
+    Measures the diversity of the genomes of a population. The Hamming distance and the entropy are computed from how
+    many individuals have each value in each free cell (see value_frequencies), so they are exact and only need one
+    pass over the genomes, instead of comparing every pair of individuals.
+
+    Args:
+        genomes (np.ndarray): The (N, side * side) genomes.
+        context (PuzzleContext): The context of the puzzle (for its free cells).
+
+    Returns:
+        Diversity: The diversity of the genomes.
+    """
+
+    frequencies = value_frequencies(genomes, context.free_cells, context.side)
+    entropy = cell_entropy(frequencies, len(genomes))
+    return Diversity(mean_hamming(frequencies, len(genomes)), float(entropy.mean()) if len(entropy) else 0.0,
+                     distinct_genomes(genomes))
+
+
+def value_frequencies(genomes, cells, side):
+    """ Returns an (len(cells), side) array with how many genomes have each value (from 1 to side) in each cell """
+    values = np.asarray(genomes)[:, cells].astype(np.intp) - 1
+    # Each (cell, value) pair gets its own bin, so all the cells are counted in one bincount
+    bins = values + side * np.arange(len(cells))
+    return np.bincount(bins.ravel(), minlength=len(cells) * side).reshape(len(cells), side)
+
+
+def mean_hamming(frequencies, n):
+    """ Returns the mean Hamming distance between 2 of the n genomes, as a fraction of the cells, from their value
+    frequencies. In each cell, the number of pairs of genomes with different values is (n^2 - sum of the squared
+    frequencies) / 2, out of n (n - 1) / 2 pairs """
+    if n < 2 or len(frequencies) == 0:
+        return 0.0
+    frequencies = frequencies.astype(np.float64)
+    different = n * n - (frequencies ** 2).sum(axis=1)
+    return float(different.sum() / (n * (n - 1) * len(frequencies)))
+
+
+def cell_entropy(frequencies, n):
+    """ Returns the entropy (in bits) of the values of each cell across the n genomes, from their value frequencies """
+    p = frequencies / max(n, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return -np.where(p > 0, p * np.log2(p), 0).sum(axis=1)
+
+
+def genome_hashes(genomes):
+    """ Returns a 64-bit hash of each genome, as a uint64 vector. The hash is a sum of the values of the cells, each one
+    multiplied by a fixed random odd 64-bit weight (wrapping around on overflow), so all the genomes are hashed at once.
+    2 different genomes can have the same hash (very rarely), so the genomes with the same hash still have to be
+    compared """
+    genomes = np.asarray(genomes)
+    return genomes.astype(np.uint64) @ _hash_weights(genomes.shape[1])
+
+
+def distinct_genomes(genomes):
+    """ Returns the number of distinct genomes. Each genome is seen as one opaque value of its bytes, so they are
+    compared as a whole instead of value by value """
+    genomes = np.ascontiguousarray(genomes)
+    if len(genomes) == 0:
+        return 0
+    rows = genomes.view(np.dtype((np.void, genomes.dtype.itemsize * genomes.shape[1])))
+    return int(len(np.unique(rows)))
+
+
+@lru_cache(maxsize=None)
+def _hash_weights(cells):
+    # The weights are always the same (they don't use the RNG of the population), so the hashes are reproducible
+    weights = np.random.default_rng(0x9E3779B97F4A7C15).integers(0, 2 ** 64, cells, dtype=np.uint64, endpoint=False)
+    return weights | np.uint64(1)
@@ -0,0 +1,81 @@
+import numpy as np
+
+from charles.charles_file import Individual, mask_digits
+
+
+def solve_exact(original_sudoku):
+    """
+    Exact solver, with backtracking over bitmasks: the digits that are used in each row, column and grid are kept as
+    masks with one bit per digit, and in each step we fill the empty cell with fewer candidates (the most constrained
+    one), trying its candidates in increasing order. It is deterministic, and it gives a ground truth for the GA.
+
+    Args:
+        original_sudoku (Original): The puzzle to solve (its candidate masks are used, so a presolved puzzle is
+            solved faster).
+
+    Returns:
+        Individual: The solution (with fitness 1), or None if the puzzle has no solution.
+    """
+
+    values = np.asarray(original_sudoku.values).tolist()
+    candidates = np.asarray(original_sudoku.candidates).tolist()
+    side, box = original_sudoku.side, original_sudoku.box
+
+    # The masks of the digits that are already used in each row, column and grid
+    rows = [0] * side
+    columns = [0] * side
+    grids = [0] * side
+    empty = []
+    for i in range(side):
+        for j in range(side):
+            digit = values[i][j]
+            if digit == 0:
+                empty.append((i, j))
+                continue
+            bit = 1 << (digit - 1)
+            # If a digit is given twice in the same row, column or grid, there is no solution
+            if (rows[i] | columns[j] | grids[box * (i // box) + j // box]) & bit:
+                return None
+            rows[i] |= bit
+            columns[j] |= bit
+            grids[box * (i // box) + j // box] |= bit
+
+    def search(empty):
+        if not empty:
+            return True
+        # We choose the empty cell with fewer legal digits. If one of them has no legal digits, we need to go back
+        best, best_mask, best_size = None, 0, side + 1
+        for position, (i, j) in enumerate(empty):
+            mask = candidates[i][j] & ~(rows[i] | columns[j] | grids[box * (i // box) + j // box])
+            size = mask.bit_count()
+            if size < best_size:
+                best, best_mask, best_size = position, mask, size
+                if size <= 1:
+                    break
+        if best_size == 0:
+            return False
+
+        i, j = empty[best]
+        grid = box * (i // box) + j // box
+        rest = empty[:best] + empty[best + 1:]
+        for digit in mask_digits(best_mask):
+            bit = 1 << (digit - 1)
+            values[i][j] = digit
+            rows[i] |= bit
+            columns[j] |= bit
+            grids[grid] |= bit
+            if search(rest):
+                return True
+            rows[i] ^= bit
+            columns[j] ^= bit
+            grids[grid] ^= bit
+        values[i][j] = 0
+        return False
+
+    if not search(empty):
+        return None
+
+    solution = Individual()
+    solution.values = values
+    solution.get_fitness()
+    return solution
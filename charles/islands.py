@@ -0,0 +1,125 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from queue import Empty
+
+import numpy as np
+
+from charles.charles_file import Individual, Original, Population
+from charles.selection import ranking
+from charles.crossover import pmx_co
+from charles.mutation import inversion_mutation
+
+
+def run_islands(original_sudoku, islands=None, size=100, optim="max", gens=1000, migration_interval=10, migrants=2,
+                topology="ring", select=ranking, crossover=pmx_co, mutate=inversion_mutation, co_p=0.9, mu_p=0.1,
+                elitism=0.1, observers=(), seed=None, local_search=None, restart=None, duplicates=None):
+    """
+    Island model: runs one population per process, and every migration_interval generations each island sends a copy
+    of its best individuals to other islands, which replace their worst individuals with them. As soon as one island
+    finds a solution, all the islands stop. An island that gets stuck doesn't stop: it is restarted in place by the
+    restart policy, or (without one, or when the policy reaches its limit) it keeps its best individual and gets new
+    random individuals for all the others, and keeps evolving and migrating until it runs all its generations.
+
+    Args:
+        original_sudoku (Original): The puzzle to solve.
+        islands (int): Number of islands (processes). By default, one per core.
+        size (int): Number of individuals in each island.
+        optim (str): "max" or "min".
+        gens (int): Maximum number of generations of each island.
+        migration_interval (int): Number of generations between migrations.
+        migrants (int): Number of individuals that each island sends in each migration.
+        topology (str): "ring" (each island sends to the next one) or "full" (each island sends to all the others).
+        select, crossover, mutate, co_p, mu_p, elitism, local_search, restart, duplicates: The same as in
+            Population.evolve.
+        observers (list): Observers of the populations (see charles.observers). Each process gets a copy of them.
+        seed (int): The seed from which the independent RNG streams of the islands are spawned (None for a random one).
+
+    Returns:
+        Individual, list: The best individual found in all the islands, and the fitness of the best individual of
+        each generation, for each island.
+    """
+
+    islands = islands or os.cpu_count()
+    targets = [island_targets(island, islands, topology) for island in range(islands)]
+    seeds = np.random.SeedSequence(seed).spawn(islands)
+
+    with Manager() as manager:
+        # The migrants travel between the islands as (k, side * side) arrays, through one queue per island
+        inboxes = [manager.Queue() for _ in range(islands)]
+        stop = manager.Event()
+        with ProcessPoolExecutor(max_workers=islands) as executor:
+            futures = [executor.submit(_run_island, np.asarray(original_sudoku.values), size, optim, gens,
+                                       migration_interval, migrants, select, crossover, mutate, co_p, mu_p, elitism,
+                                       local_search, inboxes[island], [inboxes[target] for target in targets[island]],
+                                       stop, observers, seeds[island], restart, duplicates)
+                       for island in range(islands)]
+            results = [future.result() for future in futures]
+
+    # The best individual is the best of the best individuals of each island
+    genomes = [genome for genome, _, _ in results]
+    fitnesses = [fitness for _, fitness, _ in results]
+    position = int(np.argmax(fitnesses) if optim == "max" else np.argmin(fitnesses))
+    best = Individual()
+    best.values = genomes[position]
+    best.fitness = fitnesses[position]
+    return best, [history for _, _, history in results]
+
+
+def island_targets(island, islands, topology):
+    """ Returns the islands to which the given island sends its migrants """
+    if topology == "ring":
+        return [(island + 1) % islands] if islands > 1 else []
+    elif topology == "full":
+        return [target for target in range(islands) if target != island]
+    else:
+        raise Exception("No topology specified (ring or full).")
+
+
+def _run_island(values, size, optim, gens, migration_interval, migrants, select, crossover, mutate, co_p, mu_p,
+                elitism, local_search, inbox, outboxes, stop, observers, seed, restart, duplicates):
+    """ Evolves one island until it finds a solution, another island finds one, or it runs all the generations (when
+    it gets stuck, it is restarted in place). Returns the genome and fitness of its best individual, and the fitness
+    history of the island. """
+
+    original_sudoku = Original(values)
+    pop = Population(size, original_sudoku, optim, observers=observers, rng=seed)
+
+    history = []
+    stagnation = int(0.1*gens)
+    while pop.generation < gens and not stop.is_set():
+        # Evolve until the generation of the next migration. Each call continues the previous one (resume=True), so the
+        # history and the stagnation counter cover all the generations of the island, and the island is only stuck
+        # when the fitness didn't improve for 10% of all its generations
+        target = min(pop.generation + migration_interval, gens)
+        solution_found, history = pop.evolve(target, select, crossover, mutate, co_p, mu_p, elitism, stop=stop,
+                                             local_search=local_search, resume=True, restart=restart,
+                                             duplicates=duplicates, stagnation=stagnation)
+        if solution_found:
+            stop.set()
+            break
+        # Another island found a solution
+        if stop.is_set():
+            break
+        # If evolve gave up (the island got stuck, and there is no restart policy or it reached its limit), the island
+        # doesn't stop, since its process would be idle for the rest of the run: it keeps its best individual, gets new
+        # random individuals for all the others, and starts again the stagnation counter, the restarts of the policy
+        # and the mutation probability
+        if pop.generation < target or pop.stopped_fitness >= stagnation:
+            pop.reseed(pop.size - 1)
+            pop.stopped_fitness = 0
+            pop.restarts = 0
+            pop.mutation_p = None
+
+        # We send a copy of our best individuals to the target islands
+        for outbox in outboxes:
+            outbox.put(pop.best_genomes(migrants))
+        # And we receive the migrants that the other islands sent us in the meantime (without waiting for them)
+        while True:
+            try:
+                pop.replace_worst(inbox.get_nowait())
+            except Empty:
+                break
+
+    best = pop.best_positions(1)[0]
+    return pop.genomes[best].copy(), float(pop.fitnesses[best]), history
@@ -0,0 +1,152 @@
+from math import isqrt
+
+import numpy as np
+
+from charles.charles_file import digit_counts
+
+
+def hill_climbing(individual, context, rng, max_steps=50):
+    """
+    Implementation of hill climbing (steepest descent) over swaps of 2 free cells in the same row, the same move that
+    SWAP makes. In each step, we look at every possible swap, and we make the one that removes more conflicts in the
+    columns and grids (see swap_deltas), until no swap removes conflicts.
+
+    Args:
+        individual (Individual): Individual to improve.
+        context (PuzzleContext): The context of the puzzle that is being solved.
+        rng (np.random.Generator): The random number generator of the run (used to break ties between the best swaps).
+        max_steps (int): Maximum number of swaps.
+
+    Returns:
+        Individual: The same individual, after the swaps.
+    """
+
+    swaps = context.swaps
+    if len(swaps) == 0:
+        return individual
+    counts = _counts(individual)
+
+    for step in range(max_steps):
+        deltas = swap_deltas(individual.values, counts, swaps)
+        best = deltas.min()
+        # If no swap removes conflicts, we reached a local optimum (or the solution)
+        if best >= 0:
+            break
+        # If there are several best swaps, we choose one of them at random
+        row, column1, column2 = swaps[rng.choice(np.flatnonzero(deltas == best))]
+        individual.swap_cells(row, column1, column2)
+
+    return individual
+
+
+def tabu_search(individual, context, rng, max_steps=50, tenure=10):
+    """
+    Implementation of tabu search over swaps of 2 free cells in the same row. In each step, we make the best swap (as
+    in hill_climbing), even if it adds conflicts, except for the swaps that were made in the last tenure steps (they
+    are tabu, so that we don't go back to where we came from), unless they lead to a grid with fewer conflicts than the
+    best that we found so far. At the end, the individual gets the best grid that we found.
+
+    Args:
+        individual (Individual): Individual to improve.
+        context (PuzzleContext): The context of the puzzle that is being solved.
+        rng (np.random.Generator): The random number generator of the run (used to break ties between the best swaps).
+        max_steps (int): Maximum number of swaps.
+        tenure (int): Number of steps during which a swap that was made can't be made again.
+
+    Returns:
+        Individual: The same individual, with the best grid that was found.
+    """
+
+    swaps = context.swaps
+    if len(swaps) == 0:
+        return individual
+    counts = _counts(individual)
+
+    # The conflicts of the current grid and of the best grid that we found, and the step until which each swap is tabu
+    conflicts = best_conflicts = conflict_count(counts)
+    best_genome = individual._genome.copy()
+    tabu_until = np.zeros(len(swaps), dtype=np.intp)
+
+    for step in range(max_steps):
+        if conflicts == 0:
+            break
+        deltas = swap_deltas(individual.values, counts, swaps)
+        # The tabu swaps are allowed if they give us a new best grid (aspiration criterion)
+        allowed = (tabu_until <= step) | (conflicts + deltas < best_conflicts)
+        if not allowed.any():
+            break
+        deltas = np.where(allowed, deltas, np.iinfo(deltas.dtype).max)
+        move = rng.choice(np.flatnonzero(deltas == deltas.min()))
+        row, column1, column2 = swaps[move]
+        individual.swap_cells(row, column1, column2)
+        conflicts += int(deltas[move])
+        tabu_until[move] = step + 1 + tenure
+
+        if conflicts < best_conflicts:
+            best_conflicts = conflicts
+            best_genome = individual._genome.copy()
+
+    # If we ended in a worse grid than the best one, we go back to the best one (this counts its digits again)
+    if conflicts > best_conflicts:
+        individual.values = best_genome
+    return individual
+
+
+def swap_deltas(values, counts, swaps):
+    """ Returns, for each swap (row, column1, column2), by how much it would change the number of conflicts in the
+    columns and grids of the individual (see conflict_count), using only its digit counts. The counts of the rows don't
+    change with a swap, so they are not needed.
+
+        Args:
+            values (np.ndarray): The side x side values of the individual.
+            counts (np.ndarray): The digit counts of the individual, with shape (3, side, side) (see digit_counts).
+            swaps (np.ndarray): An (M, 3) array with the swaps (see PuzzleContext.swaps).
+
+        Returns:
+            np.ndarray: An int array with shape (M,). Negative values are swaps that remove conflicts.
+    """
+
+    rows, columns1, columns2 = swaps[:, 0], swaps[:, 1], swaps[:, 2]
+    box = isqrt(len(values))
+    # The digits (from 0 to 8) that are going to change places
+    digits1 = values[rows, columns1].astype(np.intp) - 1
+    digits2 = values[rows, columns2].astype(np.intp) - 1
+    column_counts = counts[1].astype(np.intp)
+    grid_counts = counts[2].astype(np.intp)
+
+    # When a digit leaves a unit, a conflict is removed if the digit was repeated there, and when a digit enters a unit,
+    # a conflict is added if the digit was already there. Each one of the 2 columns loses one digit and gets the other
+    deltas = (_enter(column_counts, columns1, digits2) - _leave(column_counts, columns1, digits1)
+              + _enter(column_counts, columns2, digits1) - _leave(column_counts, columns2, digits2))
+    # The same applies to the grids, but only if the 2 cells are in different grids
+    grids1 = box * (rows // box) + columns1 // box
+    grids2 = box * (rows // box) + columns2 // box
+    deltas += (grids1 != grids2) * (_enter(grid_counts, grids1, digits2) - _leave(grid_counts, grids1, digits1)
+                                    + _enter(grid_counts, grids2, digits1) - _leave(grid_counts, grids2, digits2))
+    # Swapping 2 equal digits changes nothing
+    deltas[digits1 == digits2] = 0
+    return deltas
+
+
+def conflict_count(counts):
+    """ Returns the number of conflicts in the columns and grids of an individual, from its digit counts: for each
+    column and grid, the number of cells that would have to change for it to have no repeated digits. A grid whose rows
+    have no repeated digits is a solution when it has no conflicts. """
+    counts = np.asarray(counts)[1:].astype(np.intp)
+    return int(np.maximum(counts - 1, 0).sum())
+
+
+def _enter(counts, units, digits):
+    return (counts[units, digits] >= 1).astype(np.intp)
+
+
+def _leave(counts, units, digits):
+    return (counts[units, digits] > 1).astype(np.intp)
+
+
+def _counts(individual):
+    """ The local search needs the digit counts of the individual, so if it is not keeping them yet (for example, if it
+    doesn't belong to a population), it starts keeping them """
+    if individual.counts is None:
+        individual.counts = digit_counts(individual._genome)[0]
+    return individual.counts
@@ -1,16 +1,11 @@
-from random import randint, sample
-from puzzles import puzzle
-import numpy as np
-
-puzzle_as_array = np.asarray([puzzle[x:x+9] for x in range(0, len(puzzle), 9)])
-
-
-def swap_mutation(individual):
+def swap_mutation(individual, context, rng):
     """
     Implementation of swap mutation.
 
     Args:
         individual (Individual): Individual for mutation.
+        context (PuzzleContext): The context of the puzzle that is being solved.
+        rng (np.random.Generator): The random number generator of the run.
 
     Returns:
         Individual: One individual, resulting from the mutation.
@@ -18,8 +13,8 @@ def swap_mutation(individual):
 
     # We start by getting 2 indexes. We are going to perform the mutation within those N rows, from the row with
     # index = mutation_rows1, until the row with index = mutation_rows2
-    mutation_rows1 = randint(0, 8)
-    mutation_rows2 = randint(1, 9)
+    mutation_rows1 = rng.integers(0, context.side)
+    mutation_rows2 = rng.integers(1, context.side + 1)
 
     # If the first value is bigger than the 2nd, we just flip it, making the 1st = the 2nd, and the 2nd = the 1st
     if mutation_rows1 > mutation_rows2:
@@ -30,44 +25,44 @@ def swap_mutation(individual):
     # Then, we go perform the mutation operation within rows with index = mutation_rows1, until rows with
     # index = mutation_rows2
     for i in range(mutation_rows1, mutation_rows2):
-        individual.values[i] = SWAP(individual.values[i], i)
+        SWAP(individual, i, context, rng)
 
     # After performing all the operations, we return the offspring
     return individual
 
 
-def SWAP(row, row_number):
+def SWAP(individual, row_number, context, rng):
     """
-    This function receives one row and the row number, and performs swap mutation inside that row. At the end of the
-    swap, the function returns the row with the elements swapped.
+    This function receives one individual and a row number, and performs swap mutation inside that row of the
+    individual. The swap is done with Individual.swap_cells, so that the digit counts of the individual are updated only
+    for the cells that changed.
     """
 
-    # We start by getting all the positions that are available for swapping (we don't want to perform mutation in the
-    # elements that were given at the beginning of the puzzle)
-    legal_values = [_ for _ in range(9)]
-    # Then, for each of those values, we are going to see if they are really available or not
-    for element in range(len(legal_values)):
-        # If in the original puzzle, in that row_number and in that element we don't have a 0, that position is not
-        # legal, so it will be removed from the legal_values list
-        if puzzle_as_array[row_number][element] != 0:
-            legal_values.remove(element)
+    # The positions that are available for swapping (we don't want to perform mutation in the elements that were given
+    # at the beginning of the puzzle) are precomputed in the context of the puzzle
+    legal_values = context.free_columns[row_number]
+
+    # If the row doesn't have at least 2 cells that weren't given, there is nothing to swap
+    if len(legal_values) < 2:
+        return
 
     # After knowing which are the legal values to choose mutation points from, we choose without replacement 2 of them,
     # to perform the mutation
-    mut_points = sample(legal_values, 2)
+    mut_points = [legal_values[k] for k in rng.choice(len(legal_values), 2, replace=False)]
     # In the chosen row, in the position of the 1st mutation point, we are going to store the value that was originally
     # in the position of the 2nd mutation point (and vice-versa).
-    row[mut_points[0]], row[mut_points[1]] = row[mut_points[1]], row[mut_points[0]]
-
-    return row
+    individual.swap_cells(row_number, mut_points[0], mut_points[1])
+    return
 
 
-def inversion_mutation(individual):
+def inversion_mutation(individual, context, rng):
     """
     Implementation of inversion mutation.
 
     Args:
         individual (Individual): Individual for mutation.
+        context (PuzzleContext): The context of the puzzle that is being solved.
+        rng (np.random.Generator): The random number generator of the run.
 
     Returns:
         Individual: One individual, resulting from the mutation.
@@ -75,8 +70,8 @@ def inversion_mutation(individual):
 
     # We start by getting 2 indexes. We are going to perform the mutation within those N rows, from the row with
     # index = mutation_rows1, until the row with index = mutation_rows2
-    mutation_rows1 = randint(0, 8)
-    mutation_rows2 = randint(1, 9)
+    mutation_rows1 = rng.integers(0, context.side)
+    mutation_rows2 = rng.integers(1, context.side + 1)
 
     # If the first value is bigger than the 2nd, we just flip it, making the 1st = the 2nd, and the 2nd = the 1st
     if mutation_rows1 > mutation_rows2:
@@ -87,26 +82,28 @@ def inversion_mutation(individual):
     # Then, we go perform the mutation operation within rows with index = mutation_rows1, until rows with
     # index = mutation_rows2
     for i in range(mutation_rows1, mutation_rows2):
-        individual.values[i] = inversion(individual.values[i], i)
+        inversion(individual, i, context, rng)
 
     # After performing all the operations, we return the offspring
     return individual
 
 
-def inversion(row, row_number):
+def inversion(individual, row_number, context, rng):
     """
-    This function receives one row and the row number, and performs inversion mutation inside that row. At the end of
-    the mutation, the function returns the row with the elements inverted.
+    This function receives one individual and a row number, and performs inversion mutation inside that row of the
+    individual. The inversion is done as a sequence of swaps with Individual.swap_cells, so that the digit counts of the
+    individual are updated only for the cells that changed.
     """
 
-    mut_points = sample(range(len(row)), 2)
-    mut_points.sort()
+    mut_points = sorted(rng.choice(context.side, 2, replace=False))
     until = int(len(range(mut_points[0], mut_points[1]+1))/2)
 
+    # The cells that were given at the beginning of the puzzle can't be swapped
+    fixed = context.fixed[row_number]
     count = 0
     for element in range(mut_points[0], mut_points[0]+until+1):
-        if puzzle_as_array[row_number][element] == 0 and puzzle_as_array[row_number][mut_points[1]-count] == 0:
-            row[element], row[mut_points[1]-count] = row[mut_points[1]-count], row[element]
+        if not fixed[element] and not fixed[mut_points[1]-count]:
+            individual.swap_cells(row_number, element, mut_points[1]-count)
         count += 1
 
-    return row
+    return
@@ -0,0 +1,95 @@
+import json
+import sys
+from collections import namedtuple
+
+
+# The record that the observers receive at the end of each generation: the number of the generation (starting in 0),
+# the fitness of the best individual, the mean fitness of the population, the number of fitness evaluations performed
+# and saved in that generation, the seconds since evolve started, the diversity of the population (the mean Hamming
+# distance, the mean entropy of the free cells and the number of distinct genomes, see charles.diversity), and the
+# number of duplicated offspring that were rejected and that reused the fitness of the first copy
+GenerationStats = namedtuple("GenerationStats", ["generation", "best_fitness", "mean_fitness", "evaluations",
+                                                 "evaluations_saved", "seconds", "hamming", "entropy", "distinct",
+                                                 "rejected", "reused"],
+                             defaults=(None, None, None, 0, 0))
+
+
+class Observer(object):
+    """ The interface of the observers of Population.evolve. The default methods do nothing, so an observer only needs
+    to implement the events that it is interested in. """
+
+    def on_generation(self, population, stats):
+        """ Called at the end of every generation """
+        return
+
+    def on_restart(self, population, stats):
+        """ Called when the fitness got stuck, and the population is restarted (by the restart policy of evolve, or by
+        whoever called evolve, when it gives up) """
+        return
+
+    def on_solution(self, population, stats, individual):
+        """ Called when a solution (an individual with fitness 1) is found """
+        return
+
+
+class ConsoleObserver(Observer):
+    """ Prints the best individual of every generation, and when a solution is found or the population got stuck """
+
+    def on_generation(self, population, stats):
+        print(f"Best Individual: {population[population.best_positions(1)[0]]}")
+
+    def on_restart(self, population, stats):
+        print("The solutions got stuck... Re-starting the population...")
+
+    def on_solution(self, population, stats, individual):
+        print("Solution found!")
+
+
+class JsonlObserver(Observer):
+    """ Appends one JSON line per event to a file """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def _write(self, event, stats, **extra):
+        # The file is only opened when the first event arrives (so the observer can be sent to other processes)
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps({"event": event, **stats._asdict(), **extra}) + "\n")
+        self._file.flush()
+
+    def on_generation(self, population, stats):
+        self._write("generation", stats)
+
+    def on_restart(self, population, stats):
+        self._write("restart", stats)
+
+    def on_solution(self, population, stats, individual):
+        self._write("solution", stats, values=individual.values.tolist())
+
+    def __getstate__(self):
+        return {"path": self.path, "_file": None}
+
+
+class ProgressObserver(Observer):
+    """ Shows a progress bar with the generation and the best fitness, in the standard error """
+
+    def __init__(self, gens, width=30, stream=None):
+        self.gens = gens
+        self.width = width
+        self.stream = stream
+
+    def on_generation(self, population, stats):
+        done = min(stats.generation + 1, self.gens)
+        filled = int(self.width * done / self.gens)
+        stream = self.stream or sys.stderr
+        stream.write(f"\r[{'#' * filled}{'.' * (self.width - filled)}] {done}/{self.gens} "
+                     f"best fitness: {stats.best_fitness:.4f} diversity: {stats.hamming:.3f}")
+        stream.flush()
+
+    def on_restart(self, population, stats):
+        (self.stream or sys.stderr).write("\n")
+
+    def on_solution(self, population, stats, individual):
+        (self.stream or sys.stderr).write("\n")
@@ -0,0 +1,117 @@
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+# The phases that Population measures: the initialization (in __init__), and the phases of each generation of evolve
+PHASES = ("initialization", "selection", "crossover", "mutation", "fitness", "elitism", "local_search", "reporting",
+          "checkpoint", "restart")
+
+
+class Profiler(object):
+    """
+    Measures the time (with a monotonic timer) and, if memory is True, the memory allocated (with tracemalloc) in each
+    phase of a Population, for each generation and for the whole run. It is given to the Population when it is created
+    (Population(..., profile=Profiler())), and its report can be read after evolve (population.profile.report()).
+
+    tracemalloc makes every allocation slower, so the memory should only be measured when it is needed. The times are
+    always measured. The profiler starts tracemalloc when it measures a phase, and stops it in close (which Population
+    calls at the end of the initialization and of evolve), but only if it was the one that started it. If someone else
+    is already tracing the memory (for example, a benchmark that measures the peak of the whole run), the profiler
+    doesn't reset their peak, so it only measures the allocated bytes.
+    """
+
+    enabled = True
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        # The measures of each phase: in the initialization, in each generation, and in the whole run
+        self.initialization = {}
+        self.generations = []
+        self.total = {}
+        # Where the next phases are added (the initialization until the first generation starts)
+        self._current = self.initialization
+        # If this profiler started tracemalloc (and has to stop it)
+        self._tracing = False
+
+    def start_generation(self):
+        """ Called by evolve at the start of each generation, so that the next phases are added to a new generation """
+        self._current = {}
+        self.generations.append(self._current)
+        return
+
+    @contextmanager
+    def phase(self, name):
+        """ Measures the code that runs inside the with block as the given phase. For the memory, it measures how many
+        bytes the phase left allocated (allocated) and the most bytes that it had allocated at any time (peak) """
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            if self._tracing:
+                tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            measure = {"seconds": perf_counter() - start, "calls": 1}
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                measure["allocated"] = current - before
+                if self._tracing:
+                    measure["peak"] = peak - before
+            _add(self._current, name, measure)
+            _add(self.total, name, measure)
+
+    def report(self):
+        """ Returns the measures of the initialization, of each generation and of the whole run, as dicts of phase
+        names to dicts with the seconds, the number of calls and (if the memory is measured) the allocated and peak
+        bytes """
+        return {"initialization": self.initialization, "generations": self.generations, "total": self.total}
+
+    def close(self):
+        """ Stops tracemalloc, if this profiler started it (the next phase that is measured starts it again) """
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        return
+
+    def __repr__(self):
+        return f"Profiler(memory={self.memory}, generations={len(self.generations)})"
+
+
+class NullProfiler(object):
+    """ The profiler that Population uses when it is not profiling: its phases do nothing, so the instrumentation costs
+    one method call per phase """
+
+    enabled = False
+
+    def start_generation(self):
+        return
+
+    def phase(self, name):
+        return _NO_PHASE
+
+    def report(self):
+        return None
+
+    def close(self):
+        return
+
+    def __repr__(self):
+        return "NullProfiler()"
+
+
+# The with block of a phase that is not measured (nullcontext can be entered any number of times)
+_NO_PHASE = nullcontext()
+NULL_PROFILER = NullProfiler()
+
+
+def _add(measures, name, measure):
+    """ Adds a measure of a phase to a dict of measures: the seconds, calls and allocated bytes are added up, and the
+    peak is the biggest one """
+    if name not in measures:
+        measures[name] = dict(measure)
+        return
+    for key, value in measure.items():
+        measures[name][key] = max(measures[name][key], value) if key == "peak" else measures[name][key] + value
@@ -0,0 +1,83 @@
+class RestartPolicy(object):
+    """ The interface of the restart policies of Population.evolve. When the best fitness doesn't improve for a while,
+    evolve calls restart instead of giving up, so the population is restarted in place (without building a new
+    Population, and reusing the candidates of the puzzle) and keeps the progress that it made. After limit restarts
+    (None for no limit), evolve gives up as it does without a policy. If collapse is given, evolve also restarts the
+    population as soon as its mean Hamming distance (see charles.diversity) falls below it, without waiting. """
+
+    def __init__(self, limit=None, collapse=None):
+        self.limit = limit
+        self.collapse = collapse
+
+    def restart(self, population, mu_p):
+        """ Restarts the population in place, and returns the mutation probability for the next generations (evolve
+        goes back to its mu_p argument as soon as the best fitness improves) """
+        return mu_p
+
+    def __repr__(self):
+        return f"{type(self).__name__}(limit={self.limit}, collapse={self.collapse})"
+
+
+class KeepElites(RestartPolicy):
+    """ Keeps the best individuals (keep of them, with the same meaning as the elitism argument of evolve, see
+    Population.elite_count) and replaces all the others by new random individuals """
+
+    def __init__(self, keep=0.1, limit=None, collapse=None):
+        super().__init__(limit, collapse)
+        self.keep = keep
+
+    def restart(self, population, mu_p):
+        population.reseed(population.size - population.elite_count(self.keep))
+        return mu_p
+
+    def __repr__(self):
+        return f"KeepElites(keep={self.keep}, limit={self.limit}, collapse={self.collapse})"
+
+
+class Immigrants(RestartPolicy):
+    """ Replaces only the worst individuals (a fraction of the population, or a number of individuals if fraction > 1)
+    by new random individuals, so most of the population stays as it was """
+
+    def __init__(self, fraction=0.2, limit=None, collapse=None):
+        super().__init__(limit, collapse)
+        self.fraction = fraction
+
+    def restart(self, population, mu_p):
+        population.reseed(round(self.fraction * population.size) if self.fraction < 1 else round(self.fraction))
+        return mu_p
+
+    def __repr__(self):
+        return f"Immigrants(fraction={self.fraction}, limit={self.limit}, collapse={self.collapse})"
+
+
+class RaiseMutation(RestartPolicy):
+    """ Keeps the population, but multiplies the mutation probability by factor (up to max_mu_p) until the best fitness
+    improves, so the population moves away from where it got stuck """
+
+    def __init__(self, factor=2, max_mu_p=1, limit=None, collapse=None):
+        super().__init__(limit, collapse)
+        self.factor = factor
+        self.max_mu_p = max_mu_p
+
+    def restart(self, population, mu_p):
+        return min(mu_p * self.factor, self.max_mu_p)
+
+    def __repr__(self):
+        return (f"RaiseMutation(factor={self.factor}, max_mu_p={self.max_mu_p}, limit={self.limit}, "
+                f"collapse={self.collapse})")
+
+
+class Combined(RestartPolicy):
+    """ Applies several policies in order, in each restart (for example, Combined(Immigrants(), RaiseMutation())) """
+
+    def __init__(self, *policies, limit=None, collapse=None):
+        super().__init__(limit, collapse)
+        self.policies = policies
+
+    def restart(self, population, mu_p):
+        for policy in self.policies:
+            mu_p = policy.restart(population, mu_p)
+        return mu_p
+
+    def __repr__(self):
+        return f"Combined({', '.join(map(repr, self.policies))}, limit={self.limit}, collapse={self.collapse})"
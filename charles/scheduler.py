@@ -0,0 +1,156 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import Manager
+from time import perf_counter
+
+import numpy as np
+
+from charles.charles_file import Individual, Original, Population
+from charles.checkpoint import Checkpointer
+from charles.exact import solve_exact
+from charles.selection import ranking
+from charles.crossover import pmx_co
+from charles.mutation import inversion_mutation
+
+
+def run_restarts(original_sudoku, workers=None, size=100, optim="max", gens=200, select=ranking, crossover=pmx_co,
+                 mutate=inversion_mutation, co_p=0.9, mu_p=0.1, elitism=0.1, seed=None, max_restarts=None,
+                 observers=(), local_search=None, exact=None, checkpoint_dir=None, checkpoint_gens=None,
+                 checkpoint_seconds=None, restart=None, duplicates=None):
+    """
+    Runs independent restarts of the GA (a new population, evolved until it finds a solution or gets stuck) in
+    parallel, in a pool of processes. Each restart gets its own RNG stream. When a restart finds a solution, the
+    restarts that are still running are stopped and the ones that didn't start yet are cancelled.
+
+    Args:
+        original_sudoku (Original): The puzzle to solve.
+        workers (int): Number of restarts running at the same time. By default, one per core.
+        size, optim: The same as in Population.
+        gens, select, crossover, mutate, co_p, mu_p, elitism, local_search, restart, duplicates: The same as in
+            Population.evolve (with a restart policy, a restart only ends when its policy reaches its limit).
+        seed (int): The seed from which the RNG streams of the restarts are spawned (None for a random one).
+        max_restarts (int): Maximum number of restarts (None to keep restarting until a solution is found).
+        observers (list): Observers of the populations (see charles.observers). Each process gets a copy of them.
+        exact (str): If the exact solver (see charles.exact) is used: None (never), "fallback" (after max_restarts
+            restarts without a solution) or "alongside" (in one of the processes, at the same time as the restarts).
+        checkpoint_dir (str): Directory where each running restart saves a checkpoint of its population (see
+            charles.checkpoint), that is deleted when the restart ends. If a run is killed, the next run with the same
+            directory (and the same puzzle) resumes the restarts that were running before starting new ones.
+        checkpoint_gens, checkpoint_seconds: How often the checkpoints are saved (see Checkpointer).
+
+    Returns:
+        Individual, dict, int, float: The best individual found (the solution, if one was found), the fitness of the
+        best individual of each generation of each restart that ran (by the index of the restart), the index of the
+        restart that found the best individual (None if it was found by the exact solver), and the total wall time in
+        seconds.
+    """
+
+    if exact not in (None, "fallback", "alongside"):
+        raise Exception("The exact argument must be None, 'fallback' or 'alongside'.")
+    start = perf_counter()
+    workers = workers or os.cpu_count()
+    seeds = np.random.SeedSequence(seed)
+    values = np.asarray(original_sudoku.values)
+
+    histories = {}
+    best_genome, best_fitness, winner = None, None, None
+    # The index of the restart that each future is running (the restarts can finish in any order)
+    indexes = {}
+    submitted = 0
+    # The restarts that still have a checkpoint are resumed first, and the new ones get the next indexes
+    resumable = []
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        names = [re.fullmatch(r"restart-(\d+)\.ckpt", name) for name in os.listdir(checkpoint_dir)]
+        resumable = sorted(int(name.group(1)) for name in names if name)
+    next_index = max(resumable, default=-1) + 1
+
+    with Manager() as manager:
+        stop = manager.Event()
+        # The exact solver gets a process of its own, so that it really runs at the same time as the restarts
+        with ProcessPoolExecutor(max_workers=workers + (exact == "alongside")) as executor:
+
+            def submit():
+                nonlocal submitted, next_index
+                submitted += 1
+                if resumable:
+                    index, resume = resumable.pop(0), True
+                else:
+                    index, resume = next_index, False
+                    next_index += 1
+                # The RNG stream of the restart is the child number index of the seed (the same as seeds.spawn)
+                restart_seed = np.random.SeedSequence(seeds.entropy, spawn_key=seeds.spawn_key + (index,))
+                checkpoint = None
+                if checkpoint_dir is not None:
+                    checkpoint = Checkpointer(os.path.join(checkpoint_dir, f"restart-{index}.ckpt"), checkpoint_gens,
+                                              checkpoint_seconds)
+                future = executor.submit(_run_restart, values, restart_seed, size, optim, gens, select, crossover,
+                                         mutate, co_p, mu_p, elitism, local_search, stop, observers, checkpoint,
+                                         resume, restart, duplicates)
+                indexes[future] = index
+                return future
+
+            running = {submit() for _ in range(workers if max_restarts is None else min(workers, max_restarts))}
+            # The exact solver runs like one more restart, that always finds the solution (and has no history)
+            exact_future = None
+            if exact == "alongside":
+                exact_future = executor.submit(_run_exact, values)
+                running.add(exact_future)
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    solution_found, genome, fitness, history = future.result()
+                    # The exact solver is not a restart, so it has no index (and no history)
+                    index = indexes.get(future)
+                    if index is not None:
+                        histories[index] = history
+                    if best_fitness is None or (fitness > best_fitness if optim == "max" else fitness < best_fitness):
+                        best_genome, best_fitness, winner = genome, fitness, index
+                    if solution_found:
+                        stop.set()
+                # If nobody found a solution yet, we replace the restarts that finished with new ones
+                if stop.is_set():
+                    for future in running:
+                        future.cancel()
+                else:
+                    while (len(running - {exact_future}) < workers
+                           and (max_restarts is None or submitted < max_restarts)):
+                        running.add(submit())
+
+    # If all the restarts ran without finding a solution, we can still solve the puzzle with the exact solver
+    if exact == "fallback" and best_fitness != 1:
+        best = solve_exact(original_sudoku)
+        if best is not None:
+            return best, histories, None, perf_counter() - start
+
+    best = Individual()
+    best.values = best_genome
+    best.fitness = best_fitness
+    return best, histories, winner, perf_counter() - start
+
+
+def _run_restart(values, seed, size, optim, gens, select, crossover, mutate, co_p, mu_p, elitism, local_search, stop,
+                 observers, checkpoint, resume, restart, duplicates):
+    """ Runs one restart with its own seed (a SeedSequence), or resumes it from its checkpoint. Returns if it found a
+    solution, the genome and fitness of its best individual, and its fitness history. """
+
+    original_sudoku = Original(values)
+    pop = Population(size, original_sudoku, optim, observers=observers, rng=seed,
+                     checkpoint=checkpoint.path if resume else None)
+    solution_found, history = pop.evolve(gens, select, crossover, mutate, co_p, mu_p, elitism, stop=stop,
+                                         local_search=local_search, checkpoint=checkpoint, resume=resume,
+                                         restart=restart, duplicates=duplicates)
+    # The restart ended, so its checkpoint is not needed anymore
+    if checkpoint is not None and os.path.exists(checkpoint.path):
+        os.remove(checkpoint.path)
+    best = pop.best_positions(1)[0]
+    return solution_found, pop.genomes[best].copy(), float(pop.fitnesses[best]), history
+
+
+def _run_exact(values):
+    """ Runs the exact solver, returning the same as _run_restart (with no history) """
+    solution = solve_exact(Original(values))
+    if solution is None:
+        raise Exception("The puzzle has no solution.")
+    return 1, solution._genome.copy(), solution.fitness, []
@@ -1,53 +1,48 @@
-from random import uniform, choice
-from operator import attrgetter
+import numpy as np
 
 
-def fps(population):
+def fps(population, n=None):
     """
     Fitness proportionate selection implementation.
 
     Args:
         population (Population): The population we want to select from.
+        n (int): Number of individuals to select (None to select just one).
 
     Returns:
-        Individual: selected individual.
+        Individual: selected individual (or a list with the n selected individuals).
     """
 
+    # The cumulative fitness of the individuals (the 'positions' on the wheel) is only computed once per generation
+    wheel = _table(population, "fps", _fps_wheel)
+    # Get 'positions' on the wheel, and find the individuals in the positions of the spins
+    spins = _spins(population, n) * wheel[-1]
+    return _select(population, np.searchsorted(wheel, spins, side="right"), n)
+
+
+def _fps_wheel(population):
+    """ Builds the wheel of the fitness proportionate selection, with the cumulative fitness of the individuals """
     if population.optim == "max":
-        # Sum total fitness
-        total_fitness = sum([i.fitness for i in population])
-        # Get a 'position' on the wheel
-        spin = uniform(0, total_fitness)
-        position = 0
-        # Find individual in the position of the spin
-        for individual in population:
-            position += individual.fitness
-            if position > spin:
-                return individual
+        return np.cumsum(population.fitnesses)
     elif population.optim == "min":
-        # Sum total fitness --> if we do 1/fitness, the individuals with smaller values of fitness
-        # (which is better in minimization problems), will have a bigger chance of being selected
-        total_fitness = sum([(1/i.fitness) for i in population])
-        # Get a 'position' on the wheel
-        spin = uniform(0, total_fitness)
-        position = 0
-        # Find individual in the position of the spin
-        for individual in population:
-            position += (1/individual.fitness)
-            if position > spin:
-                return individual
-
-
-def tournament(population):
+        # If we do 1/fitness, the individuals with smaller values of fitness (which is better in minimization
+        # problems), will have a bigger chance of being selected
+        return np.cumsum(1 / population.fitnesses)
+    else:
+        raise Exception("No optimization specified (min or max).")
+
+
+def tournament(population, n=None):
     """
     Tournament selection implementation. The size of the tournament will be 20% of the size of the population.
     This percentage can be selected when initializing the population.
 
     Args:
         population (Population): The population we want to select from.
+        n (int): Number of individuals to select (None to select just one).
 
     Returns:
-        Individual: The best individual in the tournament.
+        Individual: The best individual in the tournament (or a list with the winners of n tournaments).
     """
 
     # If the tournament size chosen is a valid percentage, the tournament size will be X% of the population size
@@ -57,57 +52,79 @@ def tournament(population):
     else:
         size = round(0.20 * population.size)
 
-    # Select individuals based on tournament size
-    tournament_pop = [choice(population.individuals) for i in range(size)]
+    # Select individuals based on tournament size: each row of the matrix has the positions of the individuals of one
+    # tournament
+    tournaments = population.rng.integers(0, len(population), (1 if n is None else n, size))
+    fitness = population.fitnesses[tournaments]
     # Check if the problem is max or min
     if population.optim == "max":
-        return max(tournament_pop, key=attrgetter("fitness"))
+        winners = np.argmax(fitness, axis=1)
     elif population.optim == "min":
-        return min(tournament_pop, key=attrgetter("fitness"))
+        winners = np.argmin(fitness, axis=1)
     else:
         raise Exception("No optimization specified (min or max).")
+    return _select(population, tournaments[np.arange(len(tournaments)), winners], n)
 
 
-def ranking(population):
+def ranking(population, n=None):
     """
     Ranking selection implementation.
 
     Args:
         population (Population): The population we want to select from.
+        n (int): Number of individuals to select (None to select just one).
 
     Returns:
-        Individual: selected individual.
+        Individual: selected individual (or a list with the n selected individuals).
     """
-    # We start by sorting the population. With population.sort(), the population will already be sorted having in mind
-    # if we are working with a minimization or a maximization problem
-    population_sort = population.sort()
-
-    # We will generate a random number between 0 and 0
-    spin = uniform(0, 1)
-    # Get a 'position' on the wheel
-    position = 0
-    # The variable "index" will be used to get the index of each individual.
-    index = 1
-    # The sum of indexes will be used for the probability of selecting an individual. The value will start as the len
-    # of the population_sort list, which will be the size of our population
-    sum_of_indexes = len(population_sort)
-
-    # For each individual, we will add the respective index (starting in 1) to the sum_of_indexes
-    for individual_index in range(len(population_sort)):
-        sum_of_indexes += individual_index
-
-    # Then, for each individual, we will say that the probability of being chosen is the position occupied by the
-    # individual in the ranking, divided by the sum of the ranking indexes of all the individuals.
-    for individual in population_sort:
-        position += index/sum_of_indexes
-        # If the spin lands in the position of that individual, we will return it
-        if position > spin:
-            return individual
-        # At the end of each iteration, we need to add 1 to the variable index
-        index += 1
-    # For example, if we have a population with 3 individuals, the sum_of_indexes variable will start as 3. Then,
-    # with the 1st for loop, we will run from 0 to 2. So, the sum_of_indexes will be 6, since 3+0=3; 3+1=4; 4+2=6.
-    # 6 is, as we wanted, the sum of the ranking indexes of all the individuals (1+2+3=6). Then, with the 2nd for loop,
-    # we will say that the position of the 1st individual is 1/6 (approximately 0.17); the position of the 2nd
-    # individual will be 1/6 + 2/6 (0.5); and the position of the 3rd individual will be 1/6 + 2/6 + 3/6 (1). So, if
-    # the spin, which is random, is for example 0.49, we will select the 2nd individual.
+
+    # The ranking (and the cumulative probabilities of the ranks) is only computed once per generation
+    order, wheel = _table(population, "ranking", _ranking_wheel)
+    # We will generate random numbers between 0 and 1, and get the ranks where they land
+    ranks = np.searchsorted(wheel, _spins(population, n), side="right")
+    return _select(population, order[np.minimum(ranks, len(order) - 1)], n)
+
+
+def _ranking_wheel(population):
+    """ Builds the wheel of the ranking selection. Returns the positions of the individuals sorted by rank (the worst
+    first), and the cumulative probability of each rank """
+
+    # We start by sorting the population, having in mind if we are working with a minimization or a maximization problem
+    if population.optim == "max":
+        order = np.argsort(population.fitnesses, kind="stable")
+    elif population.optim == "min":
+        order = np.argsort(-population.fitnesses, kind="stable")
+    else:
+        raise Exception("No optimization specified (min or max).")
+
+    # For each individual, we will say that the probability of being chosen is the position occupied by the individual
+    # in the ranking (starting in 1), divided by the sum of the ranking indexes of all the individuals. For example, if
+    # we have a population with 3 individuals, the sum of the ranking indexes is 1+2+3=6, and the position of the 1st
+    # individual on the wheel is 1/6 (approximately 0.17); the position of the 2nd individual will be 1/6 + 2/6 (0.5);
+    # and the position of the 3rd individual will be 1/6 + 2/6 + 3/6 (1). So, if the spin, which is random, is for
+    # example 0.49, we will select the 2nd individual.
+    ranks = np.arange(1, len(order) + 1)
+    return order, np.cumsum(ranks / ranks.sum())
+
+
+def _table(population, name, build):
+    """ Returns the selection table with the given name, building it if the population doesn't have it yet. The
+    population discards its tables every time the fitness of its individuals changes. """
+    table = population.selection_tables.get(name)
+    if table is None:
+        table = population.selection_tables[name] = build(population)
+    return table
+
+
+def _spins(population, n):
+    """ Returns random numbers in [0, 1) from the generator of the population: 1 if n is None, or n otherwise (all
+    generated in one batch) """
+    return population.rng.random(1 if n is None else n)
+
+
+def _select(population, positions, n):
+    """ Returns the individual in the first position (if n is None), or the list of the individuals in the positions """
+    positions = np.minimum(positions, len(population) - 1)
+    if n is None:
+        return population.individuals[positions[0]]
+    return [population.individuals[position] for position in positions]
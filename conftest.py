@@ -0,0 +1 @@
+# The tests import charles and puzzles from the root of the repository, so pytest puts it in sys.path through this file
@@ -1,5 +1,6 @@
 """
-Here, we insert the different Sudoku Puzzles, as lists of 81 elements.
+Here, we insert the different Sudoku Puzzles, as lists of 81 elements (or 256 for the 16x16 puzzles, and 625 for the
+25x25 puzzles).
     The cells of the Sudoku puzzle that are not know in the beginning of the puzzle, are inserted in the list as 0's.
 """
 
@@ -46,5 +47,51 @@ very_hard = [0, 0, 0, 0, 6, 0, 0, 0, 0,
              8, 0, 5, 0, 0, 6, 9, 0, 0,
              0, 0, 0, 5, 0, 0, 8, 0, 0]
 
+# Bigger puzzles, with grids of 4x4 cells (16x16) and of 5x5 cells (25x25), generated by shuffling the rows, columns and
+# digits of a valid grid and removing some of its cells
+
+sudoku_16x16 = [10,  0,  0,  0,  0,  0, 13,  0,  0,  0,  3,  0,  0,  1,  0, 14,
+                14, 15,  0,  0,  0,  3,  0,  0,  0,  0,  0,  0, 16,  0,  6,  0,
+                 9,  5, 13,  0,  0,  0,  0,  0,  6,  0,  2,  0,  8,  3,  0, 12,
+                12,  4,  0,  0,  0,  2,  0,  0, 15, 14,  0,  0,  0,  0,  0,  9,
+                 0,  0,  0, 12,  0,  0,  0,  0, 11,  7,  0,  0,  6,  0,  0,  2,
+                 0,  0,  4, 10,  0,  9,  0,  2,  8,  0,  0, 15,  0, 14, 11,  0,
+                 7,  0,  0,  0,  0,  0, 15,  0,  0,  0,  9,  0,  4,  0,  0,  3,
+                 2,  0,  0,  9,  0, 14,  0,  0,  0,  3,  0,  4, 15, 12,  8,  1,
+                 0,  0,  0,  0,  0,  8, 12,  0,  7,  0,  0,  9,  0, 16,  0,  4,
+                 6,  0,  0,  0,  1, 11, 14,  0,  2,  4, 16,  0, 12,  0,  0,  0,
+                 0,  0,  0,  0,  0,  0,  0,  6,  0,  0,  8,  0, 14, 11,  1,  0,
+                 0,  0, 12,  8,  2,  0,  0,  0,  0,  5, 11,  0,  9, 13,  0,  6,
+                11,  0,  0, 15, 10,  0,  3,  8, 14, 13,  0,  7,  2,  6,  0,  0,
+                 8,  0,  0,  4,  0,  0,  0, 16,  0,  0,  0,  1,  7,  0,  0,  0,
+                 0,  0,  0,  0,  0,  5,  0,  0,  0,  8,  0,  0,  0,  0, 12,  0,
+                 0, 14,  7,  0,  0, 15,  0, 11,  0, 16,  6,  2,  3,  0,  0,  0]
+
+sudoku_25x25 = [ 5,  0,  9,  0,  0,  0,  0,  8,  0, 20, 19, 24, 17, 18,  0,  0,  0,  0,  0, 23,  0, 10,  0,  6, 16,
+                 0, 18, 12, 17, 19,  0,  0,  2,  9,  0, 16,  6, 14,  0,  0,  0,  0, 20, 25,  4,  0, 21,  0,  0,  0,
+                 0,  8, 22,  0, 20,  3,  0, 21, 13,  0,  7,  5, 11,  0,  9,  0, 10, 16,  0,  0, 12,  0, 17, 24, 19,
+                 3,  0,  0,  0,  0,  0, 14, 10,  0,  0, 20,  0,  4,  8, 22, 12, 18, 19,  0, 17,  0,  2,  0,  0,  7,
+                 6,  0,  1, 14, 16, 24, 17,  0,  0,  0,  0,  0, 23, 21,  0,  9,  2,  7,  5,  0, 22,  8,  4, 25,  0,
+                 0,  0,  8, 13,  4,  0,  1,  3, 21, 23, 11,  0,  0,  0,  0,  0,  0, 14,  0, 12,  0, 24,  0,  0, 17,
+                19,  6, 10, 12,  0,  7,  0, 24, 18, 17,  0,  0,  0,  0, 21,  2,  0, 11, 20,  0,  8, 25,  0, 15,  4,
+                16,  0, 21,  1, 23, 19,  0,  6, 10, 14,  0,  0, 13,  0,  8, 18,  0,  0,  7,  9,  0,  0,  0, 20, 11,
+                 0,  0,  2,  0,  0,  0, 13,  0,  8,  4,  0,  0,  9,  0,  0,  0,  0, 23,  0,  0, 10,  6,  0,  0, 14,
+                 0, 24,  0,  9, 17, 20, 22,  0,  0, 11, 14,  0,  0,  6, 10,  8,  0,  0, 15, 13, 21,  3,  1, 16, 23,
+                 0, 13,  0, 15, 25, 10,  0,  0,  0,  0,  5,  8,  0, 22, 11,  0, 12,  6,  0,  0, 17,  9,  0,  2, 24,
+                10,  0,  0, 16,  0,  0, 19,  0, 14,  0, 25,  0, 15,  0,  4,  0,  0,  0,  2,  7,  0, 22, 20,  8,  0,
+                 0,  0,  0,  0, 24,  0,  0, 22, 11,  0,  6,  0, 19,  0, 14,  4, 13,  0, 21, 15,  0,  0,  0, 10,  3,
+                 0, 22,  0, 20,  5, 21,  0,  0,  4,  0,  0,  2,  7,  9, 17, 23,  1,  3, 10, 16,  0,  0, 19,  0,  6,
+                18,  0, 14,  0,  6,  0,  7,  9, 17,  0,  3, 10, 16,  1,  0,  0, 22,  5,  0, 20,  0, 13, 15,  0, 25,
+                 0, 23, 15,  0, 21, 12,  6,  0, 16, 10,  8,  0, 25,  4, 20,  0, 17,  0,  0, 24,  0, 11,  5, 22,  2,
+                 9, 17, 19, 24, 18, 22,  0, 11,  0,  2,  0, 12,  6, 14,  0, 20,  0,  8, 13,  0, 15,  0,  0,  1, 21,
+                13,  4, 20, 25,  0,  0,  0,  0,  0, 21,  0,  0,  0, 11,  7, 16,  0,  0, 12,  6, 19,  0, 24,  0, 18,
+                 0,  0,  7,  5,  2, 13, 25,  0, 20,  0,  0,  9, 24,  0, 19, 15,  0,  0,  1,  0, 16,  0,  6,  0, 10,
+                12, 14,  0,  6,  0,  0,  0,  0,  0, 18, 21,  0,  0,  0, 15,  7, 11,  2, 22,  5, 20,  0,  0,  0,  8,
+                 0,  0,  3,  0,  0,  0,  0, 19,  0,  0,  0, 23,  0, 15,  0,  0,  7,  0, 11,  0,  0, 20,  0,  4, 22,
+                 4,  0,  5,  8, 22,  0, 21, 15,  0,  0,  0, 11,  2,  7, 24,  3, 16,  1, 14, 10,  0, 19,  0, 17, 12,
+                 0,  7, 24,  0,  0,  0,  0,  0,  0, 22,  0, 17, 18, 19,  0,  0, 15,  0,  0, 21,  3,  0,  0, 14,  0,
+                23,  0, 25,  0, 13,  0, 10, 16,  0,  0, 22,  4,  0, 20,  5,  6,  0, 12, 17, 18,  0,  7,  2,  0,  0,
+                17, 19,  0, 18,  0, 11,  2,  0,  0,  0,  0,  0,  0,  0,  0,  5,  0, 22,  4,  0, 25, 15,  0,  0, 13]
+
 # Select the puzzle that you want to use in the sudoku solver
 puzzle = medium
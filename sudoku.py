@@ -1,55 +1,61 @@
-# import timeit
-# import_module = """
 # Necessary imports
-from charles.charles_file import Original, Population
-from charles.selection import fps, tournament, ranking
-from charles.crossover import cycle_co, pmx_co
-from charles.mutation import swap_mutation, inversion_mutation
+from charles.charles_file import Original
+from charles.selection import ranking
+from charles.crossover import pmx_co
+from charles.mutation import inversion_mutation
+from charles.scheduler import run_restarts
+from charles.restarts import KeepElites
 from puzzles import puzzle
-import numpy as np
 from matplotlib import pyplot as plt
-# """
-# testcode = """
-# Converting the original puzzle (which was a list) to a numpy array
-original_puzzle_as_array = np.asarray([puzzle[x:x+9] for x in range(0, len(puzzle), 9)])
-# Creating the original puzzle with the class Original
-original_puzzle = Original(original_puzzle_as_array)
 
-# We will run until finding a solution for the puzzle
-solution_found = 0
-# Each time we start a new population from the 0, we save the fitness of the best individual of every generation
-fitness_values = []
-
-while solution_found == 0:
-    pop = Population(
-        100,
+# The driver only runs when this file is executed as a script, since the restarts run in new processes that may import
+# this module
+if __name__ == "__main__":
+    # Creating the original puzzle with the class Original (the puzzle is a list with the values of its cells, for any
+    # size of puzzle)
+    original_puzzle = Original(puzzle)
+
+    # Before the GA starts, we can fix the cells that can be deduced with constraint propagation. Those cells are then
+    # treated as givens by the initialization of the population and by the mutation operators
+    presolve = True
+    if presolve:
+        fixed_cells, presolve_time = original_puzzle.presolve()
+        print(f"Presolve fixed {fixed_cells} cells in {presolve_time:.4f} seconds")
+
+    # We will run until finding a solution for the puzzle. Each restart starts a new population from the 0, and several
+    # restarts run at the same time (one per core), until one of them finds a solution. When a population gets stuck,
+    # it first keeps its best 10% and gets new random individuals for the rest (up to 5 times), and only then it is
+    # replaced by a new restart. If no restart finds a solution after max_restarts restarts, the puzzle is solved with
+    # the exact solver
+    best_individual, histories, winner, wall_time = run_restarts(
         original_puzzle,
-        "max"
-    )
-
-    solution_found, fitness = pop.evolve(
+        size=100,
+        optim="max",
         gens=200,
         select=ranking,
         crossover=pmx_co,
         mutate=inversion_mutation,
         co_p=0.90,
         mu_p=0.10,
-        elitism=0.1
+        elitism=0.1,
+        max_restarts=100,
+        restart=KeepElites(keep=0.1, limit=5),
+        exact="fallback"
     )
-
-    fitness_values.append(fitness)
-
-fitness_all = []
-for sublist in fitness_values:
-    for fitness_value in sublist:
-        fitness_all.append(fitness_value)
-
-generations = [generation for generation in range(len(fitness_all))]
-
-plt.plot(generations, fitness_all)
-plt.show()
-print("Solution found in gen number: " + str(generations[-1]+1))
-# """
-
-# times = timeit.repeat(stmt=testcode, setup=import_module, number=1, repeat=1)
-# print("Average time:" + str(round(sum(times)/len(times), 2)))
+    print(f"Best Individual: {best_individual}")
+    print(f"Total time: {wall_time:.2f} seconds")
+
+    # We plot the fitness values of the restart that found the best individual (the restarts ran at the same time, so
+    # their generations can't be put one after the other). There are none if the exact solver found it
+    if winner is None:
+        print("Solution found by the exact solver")
+    else:
+        fitness_values = histories[winner]
+        generations = [generation for generation in range(len(fitness_values))]
+
+        plt.plot(generations, fitness_values)
+        plt.show()
+        if best_individual.fitness == 1:
+            print("Solution found in gen number: " + str(generations[-1]+1))
+        else:
+            print("No solution found after " + str(generations[-1]+1) + " generations")
@@ -0,0 +1,16 @@
+import puzzles
+from charles.batch import solve_batch
+
+
+def test_bad_puzzle_only_fails_itself(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    batch = [puzzles.easy, puzzles.very_hard[:80], puzzles.medium]
+    results = sorted(solve_batch(batch, output=output, workers=2, max_gens=40, seed=0, fallback=True),
+                     key=lambda result: result["index"])
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert results[0]["solved"] and results[2]["solved"]
+    assert results[0]["error"] is None and results[2]["error"] is None
+    assert not results[1]["solved"] and "square grid" in results[1]["error"]
+    # The error is also written to the output file
+    with open(output) as file:
+        assert len(file.readlines()) == 3
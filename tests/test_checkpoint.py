@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+import puzzles
+from charles.charles_file import Original, Population
+from charles.checkpoint import Checkpointer
+from charles.crossover import pmx_co
+from charles.mutation import inversion_mutation
+from charles.restarts import RaiseMutation
+from charles.selection import ranking
+
+
+class StopAt(object):
+    """ Stops evolve when the population reaches a generation, like a process that is killed there """
+
+    def __init__(self, population, generation):
+        self.population = population
+        self.generation = generation
+
+    def is_set(self):
+        return self.population.generation >= self.generation
+
+
+def evolve(population, **kwargs):
+    # The runs don't give up when they get stuck, so that they last the 30 generations
+    return population.evolve(30, ranking, pmx_co, inversion_mutation, 0.9, 0.1, 0.1, stagnation=30, **kwargs)
+
+
+def test_resume_is_the_same_run(tmp_path):
+    original = Original(puzzles.very_hard)
+    path = str(tmp_path / "run.ckpt")
+
+    # The run without interruptions
+    population = Population(60, original, "max", rng=3)
+    result = evolve(population)
+
+    # The same run, stopped after 10 generations and continued from its checkpoint by a new population
+    stopped = Population(60, original, "max", rng=3)
+    evolve(stopped, stop=StopAt(stopped, 10), checkpoint=Checkpointer(path))
+    assert stopped.generation == 10
+    resumed = Population(60, original, "max", checkpoint=path)
+    assert resumed.generation == 10
+    assert evolve(resumed, resume=True) == result
+    assert resumed.history == population.history
+    assert resumed.generation == population.generation == 30
+    assert np.array_equal(resumed.genomes, population.genomes)
+    assert np.array_equal(resumed.fitnesses, population.fitnesses)
+    assert np.array_equal(resumed.counts, population.counts)
+
+
+def test_restore_checks_the_population(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    population = Population(20, Original(puzzles.hard), "max", rng=0)
+    evolve(population, stop=StopAt(population, 2), checkpoint=Checkpointer(path))
+    with pytest.raises(Exception):
+        Population(10, Original(puzzles.hard), "max", checkpoint=path)
+    with pytest.raises(Exception):
+        Population(20, Original(puzzles.hard), "min", checkpoint=path)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_resume_keeps_the_raised_mutation_probability(tmp_path, seed):
+    # RaiseMutation raises the mutation probability while the population is stuck, and the resumed run must continue
+    # with the raised one, not with mu_p
+    original = Original(puzzles.very_hard)
+    path = str(tmp_path / "run.ckpt")
+
+    def evolve_stuck(population, **kwargs):
+        return population.evolve(40, ranking, pmx_co, inversion_mutation, 0.9, 0.05, 0.1, stagnation=3,
+                                 restart=RaiseMutation(factor=5), **kwargs)
+
+    population = Population(40, original, "max", rng=seed)
+    evolve_stuck(population)
+    stopped = Population(40, original, "max", rng=seed)
+    evolve_stuck(stopped, stop=StopAt(stopped, 20), checkpoint=Checkpointer(path))
+    resumed = Population(40, original, "max", checkpoint=path)
+    assert resumed.mutation_p == stopped.mutation_p
+    evolve_stuck(resumed, resume=True)
+    assert resumed.history == population.history
+    assert resumed.mutation_p == population.mutation_p
+    assert np.array_equal(resumed.genomes, population.genomes)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import puzzles
+from charles.charles_file import Original, Population, digit_counts, counts_fitness
+from charles.crossover import cycle_co, pmx_co
+from charles.mutation import inversion_mutation, swap_mutation
+from charles.selection import ranking
+
+
+def scalar(crossover):
+    """ Hides the batch version of a crossover, so that evolve calls it pair by pair """
+    return lambda p1, p2, context, rng: crossover(p1, p2, context, rng)
+
+
+@pytest.mark.parametrize("crossover", [pmx_co, cycle_co, scalar(pmx_co), scalar(cycle_co)])
+@pytest.mark.parametrize("mutate", [inversion_mutation, swap_mutation])
+@pytest.mark.parametrize("co_p", [0.0, 0.5, 1.0])
+def test_mutation_never_changes_the_parents(crossover, mutate, co_p):
+    original = Original(puzzles.very_hard)
+    population = Population(40, original, "max", rng=1)
+    # A snapshot of the buffers of the parents, taken when evolve starts a generation (when it replaces the buffers)
+    snapshot = {}
+
+    def checked_mutate(individual, context, rng):
+        if snapshot.get("genomes") is not population.genomes:
+            snapshot["genomes"] = population.genomes
+            snapshot["copies"] = (population.genomes.copy(), population.counts.copy(), population.fitnesses.copy())
+        result = mutate(individual, context, rng)
+        genomes, counts, fitnesses = snapshot["copies"]
+        assert np.array_equal(genomes, population.genomes)
+        assert np.array_equal(counts, population.counts)
+        assert np.array_equal(fitnesses, population.fitnesses, equal_nan=True)
+        return result
+
+    population.evolve(15, ranking, crossover, checked_mutate, co_p, 1.0, 0.1)
+
+    # The offspring keep their digit counts and fitness up to date, and the rows stay legal
+    assert np.array_equal(population.counts, digit_counts(population.genomes))
+    assert np.allclose(population.fitnesses, counts_fitness(population.counts))
+    grids = population.genomes.reshape(-1, 9, 9)
+    assert (np.sort(grids, axis=2) == np.arange(1, 10)).all()
+    assert (grids[:, original.context.fixed] == original.context.givens[original.context.fixed]).all()
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import puzzles
+from charles.charles_file import Original, Population
+from charles.crossover import (crossover_rows, cycle_co_batch, cycle_rows_batch, pmx_co_batch, pmx_crossover_rows,
+                               pmx_rows_batch)
+
+
+def random_rows(rng, count, side):
+    return np.array([rng.permutation(side) + 1 for _ in range(count)])
+
+
+@pytest.mark.parametrize("side", [4, 9, 16])
+def test_cycle_rows_batch_is_crossover_rows(side):
+    rng = np.random.default_rng(side)
+    rows1, rows2 = random_rows(rng, 200, side), random_rows(rng, 200, side)
+    batch1, batch2 = cycle_rows_batch(rows1, rows2)
+    for k in range(len(rows1)):
+        row1, row2 = crossover_rows(rows1[k], rows2[k])
+        assert np.array_equal(batch1[k], row1)
+        assert np.array_equal(batch2[k], row2)
+
+
+@pytest.mark.parametrize("side", [4, 9, 16])
+def test_pmx_rows_batch_is_pmx_crossover_rows(side):
+    rng = np.random.default_rng(side)
+    rows1, rows2 = random_rows(rng, 200, side), random_rows(rng, 200, side)
+    for k in range(len(rows1)):
+        row1, row2 = pmx_crossover_rows(rows1[k], rows2[k], np.random.default_rng(k))
+        # The same window that pmx_crossover_rows drew
+        start, end = np.sort(np.random.default_rng(k).choice(side, 2, replace=False))
+        x, y, start, end = rows1[k][None], rows2[k][None], np.array([start]), np.array([end])
+        assert np.array_equal(pmx_rows_batch(x, y, start, end)[0], row1)
+        assert np.array_equal(pmx_rows_batch(y, x, start, end)[0], row2)
+
+
+@pytest.mark.parametrize("batch", [cycle_co_batch, pmx_co_batch])
+def test_batch_crossover_in_place(batch):
+    # With copy=False, the offspring are written over the parents, and they are the same as with copy=True
+    population = Population(20, Original(puzzles.very_hard), "max", rng=0)
+    parents = population.genomes.reshape(-1, 2, 9, 9)
+    parents1, parents2 = parents[:, 0].copy(), parents[:, 1].copy()
+    offspring1, offspring2 = batch(parents1, parents2, population.context, np.random.default_rng(1))
+    assert np.array_equal(parents1, parents[:, 0]) and np.array_equal(parents2, parents[:, 1])
+    in_place1, in_place2 = batch(parents1, parents2, population.context, np.random.default_rng(1), copy=False)
+    assert in_place1 is parents1 and in_place2 is parents2
+    assert np.array_equal(in_place1, offspring1) and np.array_equal(in_place2, offspring2)
+    # Each offspring row is a permutation of the numbers 1 to 9
+    assert (np.sort(offspring1, axis=2) == np.arange(1, 10)).all()
+    assert (np.sort(offspring2, axis=2) == np.arange(1, 10)).all()
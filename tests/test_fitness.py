@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+import puzzles
+from charles.charles_file import Individual, Original, Population, digit_counts, population_fitness, value_dtype
+
+
+@pytest.mark.parametrize("side", [4, 9, 16])
+def test_population_fitness_is_get_fitness(side):
+    # Any grids (not only the ones with legal rows), including the solved ones
+    rng = np.random.default_rng(side)
+    genomes = rng.integers(1, side + 1, (50, side * side)).astype(value_dtype(side))
+    box = int(side ** 0.5)
+    solved = [(box * (i % box) + i // box + j) % side + 1 for i in range(side) for j in range(side)]
+    genomes[0] = solved
+    fitnesses = population_fitness(genomes)
+    for genome, fitness in zip(genomes, fitnesses):
+        individual = Individual(genome.copy())
+        individual.get_fitness()
+        # The same value, not only a close one (the sums are done in the same order)
+        assert individual.fitness == fitness
+    assert fitnesses[0] == 1
+
+
+def test_population_fitness_of_a_population():
+    population = Population(30, Original(puzzles.hard), "max", rng=0)
+    assert np.array_equal(population.counts, digit_counts(population.genomes))
+    for k, genome in enumerate(population.genomes):
+        individual = Individual(genome.copy())
+        individual.get_fitness()
+        assert individual.fitness == population.fitnesses[k]
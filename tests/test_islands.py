@@ -0,0 +1,31 @@
+import queue
+import threading
+
+import numpy as np
+import pytest
+
+import puzzles
+from charles.charles_file import Original
+from charles.crossover import pmx_co
+from charles.islands import _run_island, island_targets
+from charles.mutation import inversion_mutation
+from charles.restarts import KeepElites
+from charles.selection import ranking
+
+
+@pytest.mark.parametrize("restart", [None, KeepElites(limit=1)])
+def test_stuck_island_keeps_evolving(restart):
+    # very_hard gets stuck long before 100 generations, but the island runs all of them, and sends its migrants
+    # every 10 generations
+    inbox, outbox = queue.Queue(), queue.Queue()
+    genome, fitness, history = _run_island(np.asarray(Original(puzzles.very_hard).values), 40, "max", 100, 10, 2,
+                                           ranking, pmx_co, inversion_mutation, 0.9, 0.1, 0.1, None, inbox, [outbox],
+                                           threading.Event(), (), 1, restart, None)
+    assert len(history) == 100
+    assert outbox.qsize() >= 9
+    assert fitness == max(history)
+
+
+def test_island_targets():
+    assert island_targets(3, 4, "ring") == [0]
+    assert island_targets(1, 3, "full") == [0, 2]
@@ -0,0 +1,31 @@
+import tracemalloc
+
+import puzzles
+from charles.charles_file import Original, Population
+from charles.crossover import pmx_co
+from charles.mutation import inversion_mutation
+from charles.profiling import PHASES, Profiler
+from charles.selection import ranking
+
+
+def test_profiled_evolve_returns_the_same_values():
+    population = Population(30, Original(puzzles.hard), "max", rng=0, profile=Profiler(memory=True))
+    solution_found, history = population.evolve(10, ranking, pmx_co, inversion_mutation, 0.9, 0.1, 0.1)
+    report = population.profile.report()
+    assert len(report["generations"]) == len(history)
+    assert set(report["total"]) <= set(PHASES)
+    assert "peak" in report["total"]["crossover"]
+    # The profiler stopped the tracing that it started
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiler_leaves_other_tracing_alone():
+    tracemalloc.start()
+    try:
+        population = Population(30, Original(puzzles.hard), "max", rng=0, profile=Profiler(memory=True))
+        population.evolve(5, ranking, pmx_co, inversion_mutation, 0.9, 0.1, 0.1)
+        assert tracemalloc.is_tracing()
+        # Without its own tracing, the profiler doesn't reset the peak, so it only measures the allocated bytes
+        assert "peak" not in population.profile.report()["total"]["crossover"]
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import puzzles
+from charles.charles_file import Original, Population
+
+
+@pytest.mark.parametrize("name", ["very_hard", "sudoku_16x16"])
+def test_sampled_genomes_are_legal(name):
+    original = Original(getattr(puzzles, name))
+    context = original.context
+    side = context.side
+    genomes = Population(50, original, "max", rng=0).sample_genomes(300).reshape(-1, side, side)
+    # Each row is a permutation of the numbers 1 to side, with the givens in their cells
+    assert (np.sort(genomes, axis=2) == np.arange(1, side + 1)).all()
+    assert (genomes[:, context.fixed] == context.givens[context.fixed]).all()
+    # And each free cell has one of its candidates
+    bits = (context.candidates.astype(np.int64) >> (genomes.astype(np.int64) - 1)) & 1
+    assert bits[:, ~context.fixed].all()
+
+
+def test_same_seed_same_genomes():
+    # The rows are sampled in the same way whether the puzzle was already sampled (by another population) or not
+    original = Original(puzzles.sudoku_16x16)
+    first = Population(30, original, "max", rng=5).genomes
+    assert np.array_equal(Population(30, original, "max", rng=5).genomes, first)
+    assert np.array_equal(Population(30, Original(puzzles.sudoku_16x16), "max", rng=5).genomes, first)
+
+
+def test_assignment_rows_are_uniform():
+    # The rows that are drawn from the list of legal assignments are drawn uniformly from it
+    original = Original(puzzles.very_hard)
+    context = original.context
+    rows = [i for i in range(context.side) if context.row_sampling(i)[3] is not None]
+    assert rows
+    i = rows[0]
+    assignments = context.row_sampling(i)[3]
+    genomes = Population(10, original, "max", rng=0).sample_genomes(200 * len(assignments))
+    free = np.array(context.free_columns[i])
+    sampled = genomes.reshape(-1, context.side, context.side)[:, i, free]
+    counts = np.unique(sampled, axis=0, return_counts=True)[1]
+    assert len(counts) == len(assignments)
+    assert counts.min() > 100 and counts.max() < 300
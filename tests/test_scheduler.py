@@ -0,0 +1,19 @@
+import puzzles
+from charles.charles_file import Original
+from charles.scheduler import run_restarts
+
+
+def test_run_restarts_returns_every_history():
+    best, histories, winner, wall_time = run_restarts(Original(puzzles.very_hard), workers=2, gens=20, seed=1,
+                                                      max_restarts=3)
+    assert sorted(histories) == [0, 1, 2]
+    assert all(len(history) > 0 for history in histories.values())
+    # The winner is the restart whose best individual is the one that was returned
+    assert histories[winner][-1] == best.fitness == max(history[-1] for history in histories.values())
+
+
+def test_run_restarts_exact_alongside():
+    best, histories, winner, wall_time = run_restarts(Original(puzzles.very_hard), workers=1, gens=200, seed=1,
+                                                      max_restarts=1, exact="alongside")
+    assert best.fitness == 1
+    assert winner is None or histories[winner][-1] == 1